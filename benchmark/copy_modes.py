@@ -0,0 +1,101 @@
+import os
+import sys
+import math
+import tempfile
+
+from PIL import Image
+import numpy as np
+
+import config
+from benchmark.equivalence import generate_case
+from textureextractor.extractor import Extractor
+
+# copy modes which are compared: (copy_mode, copy_sampling)
+MODES = [("bounding_box", "nearest"), ("transform_paste", "nearest"), ("transform_paste", "bilinear")]
+
+
+def run(obj_file, camera_file, image_file, copy_mode, copy_sampling, repetitions):
+    """
+    extracts the texture with a copy mode
+
+    :return: texture array, written texels, best copy time in seconds
+    """
+    config.copy_mode = copy_mode
+    config.copy_sampling = copy_sampling
+    best = math.inf
+    texture, written = None, None
+    for _ in range(repetitions):
+        extractor = Extractor(obj_file, camera_file, image_file)
+        extractor.extract()
+        # only the copy stage depends on the copy mode
+        best = min(best, extractor.stage_times["copy"])
+        texture, written = np.array(extractor.base_texture), extractor.written
+    return texture, written, best
+
+
+def psnr(texture, reference, written):
+    """
+    peak signal to noise ratio of the written texels
+    """
+    difference = texture[written].astype(float) - reference[written].astype(float)
+    mse = np.mean(difference ** 2) if difference.size > 0 else 0.0
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(255 ** 2 / mse)
+
+
+def main():
+    if "--help" in sys.argv or (len(sys.argv) != 1 and len(sys.argv) < 4):
+        # args are path to obj file (argv[1]), camera parameters in json file format (argv[2]),
+        # the image file (argv[3]), an optional ground truth texture (argv[4]) and optional repetitions (argv[5])
+        # without args the example and a generated dense mesh are used
+        print("Usage:")
+        print(sys.argv[0] + " [path_to_obj_file path_to_camera_json path_to_image [path_to_ground_truth [repetitions]]]")
+        return
+
+    ground_truth_path = os.path.abspath(sys.argv[4]) if len(sys.argv) > 4 else None
+    repetitions = int(sys.argv[5]) if len(sys.argv) > 5 else 3
+
+    copy_mode, copy_sampling = config.copy_mode, config.copy_sampling
+    cwd = os.getcwd()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if len(sys.argv) == 1:
+            examples = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+            cases = {
+                "example": [os.path.join(examples, f) for f in ("scene.obj", "camera.json", "image.png")],
+                # many small faces, the copy time shouldn't grow with the number of faces
+                "dense_sphere": generate_case(directory, "dense_sphere", 150, 300, [[0, 0, 0]], [0.5, 1, 4],
+                                              (1280, 720), 1),
+            }
+        else:
+            cases = {"input": [os.path.abspath(p) for p in sys.argv[1:4]]}
+
+        # the extractor saves the texture in the working directory
+        os.chdir(directory)
+        try:
+            for name, paths in cases.items():
+                results[name] = {mode: run(paths[0], paths[1], paths[2], mode[0], mode[1], repetitions)
+                                 for mode in MODES}
+        finally:
+            os.chdir(cwd)
+            config.copy_mode, config.copy_sampling = copy_mode, copy_sampling
+
+    ground_truth = None
+    if ground_truth_path is not None:
+        ground_truth = np.array(Image.open(ground_truth_path).convert('RGB'))
+
+    for name, case_results in results.items():
+        print(name)
+        reference, _, reference_time = case_results[MODES[0]]
+        for mode, (texture, written, seconds) in case_results.items():
+            line = "  %s (%s): %.3f seconds, %.0f texels/second, speedup %.2f, PSNR to %s: %.2f dB" % (
+                mode[0], mode[1], seconds, written.sum() / seconds, reference_time / seconds, MODES[0][0],
+                psnr(texture, reference, written))
+            if ground_truth is not None:
+                line += ", PSNR to ground truth: %.2f dB" % psnr(texture[:, :, :3], ground_truth, written)
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
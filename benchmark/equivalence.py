@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import math
+import tempfile
+
+from PIL import Image
+import numpy as np
+
+import config
+from main import pop_option
+from textureextractor.extractor import Extractor
+
+# culling stages whose remaining faces are compared
+CULLING_STAGES = ["backface_culling", "frustum_culling", "silhouette_culling", "occlusion_culling", "group_culling"]
+
+
+def generate_sphere(file_path, rings, segments, centers):
+    """
+    writes an obj file with uv spheres of radius 1
+    the spheres consist of quads (triangulated by the parser) and triangles at the poles
+
+    :param file_path: path to obj file
+    :param rings: number of rings of every sphere
+    :param segments: number of segments of every sphere
+    :param centers: centers of the spheres
+    """
+    with open(file_path, 'w') as f:
+        v_offset, vt_offset, vn_offset = 0, 0, 0
+        for center in centers:
+            # vertices, normals and texture coordinates of the grid, each sphere uses its own part of the texture
+            for r in range(rings + 1):
+                theta = math.pi * r / rings
+                for s in range(segments + 1):
+                    phi = 2 * math.pi * s / segments
+                    n = [math.sin(theta) * math.cos(phi), math.cos(theta), math.sin(theta) * math.sin(phi)]
+                    f.write("v %f %f %f\n" % (center[0] + n[0], center[1] + n[1], center[2] + n[2]))
+                    f.write("vn %f %f %f\n" % (n[0], n[1], n[2]))
+                    f.write("vt %f %f\n" % ((s / segments + len(centers) - 1 - centers.index(center)) / len(centers),
+                                            1 - r / rings))
+
+            def idx(r, s):
+                return r * (segments + 1) + s + 1
+
+            for r in range(rings):
+                for s in range(segments):
+                    corners = [idx(r, s), idx(r + 1, s), idx(r + 1, s + 1), idx(r, s + 1)]
+                    if r == 0:
+                        # triangle at the pole
+                        corners = corners[:3]
+                    f.write("f " + " ".join("%d/%d/%d" % (c + v_offset, c + vt_offset, c + vn_offset)
+                                            for c in corners) + "\n")
+            count = (rings + 1) * (segments + 1)
+            v_offset, vt_offset, vn_offset = v_offset + count, vt_offset + count, vn_offset + count
+
+
+def generate_case(directory, name, rings, segments, centers, position, image_size, seed):
+    """
+    generates a mesh, a camera and a random image
+
+    :return: paths to obj file, camera file and image file
+    """
+    obj_file = os.path.join(directory, name + ".obj")
+    camera_file = os.path.join(directory, name + ".json")
+    image_file = os.path.join(directory, name + ".png")
+    generate_sphere(obj_file, rings, segments, centers)
+    with open(camera_file, 'w') as f:
+        look = [-p for p in position]
+        json.dump({"fov_horizontal": 50, "position": position, "look_direction": look, "up_direction": [0, 1, 0]}, f)
+
+    # smooth gradients with noise, so wrong pixels are visible in the comparison
+    random = np.random.RandomState(seed)
+    y, x = np.mgrid[0:image_size[1], 0:image_size[0]]
+    image = np.stack([x * 255 // image_size[0], y * 255 // image_size[1], (x + y) % 256], axis=2)
+    image = np.clip(image + random.randint(-20, 20, image.shape), 0, 255).astype(np.uint8)
+    Image.fromarray(image).save(image_file)
+    return obj_file, camera_file, image_file
+
+
+def run(case, engine, copy_mode, copy_sampling):
+    """
+    extracts the texture of a case with an engine
+
+    :return: dictionary with the remaining faces of each stage (original face indices), the projected vertices
+             (original vertex index --> position), the texture and the stage times
+    """
+    config.engine, config.copy_mode, config.copy_sampling = engine, copy_mode, copy_sampling
+    extractor = Extractor(*case)
+    extractor.trace = True
+    face_indices = {f: i for i, f in enumerate(extractor.scene.faces)}
+    vertex_indices = {v: i for i, v in enumerate(extractor.scene.vertices)}
+    extractor.extract()
+    return {
+        "faces": {stage: {face_indices[f] for f in faces} for stage, faces in extractor.stage_faces.items()},
+        "vertices": {vertex_indices[v]: v.pos for v in extractor.scene.vertices},
+        "texture": np.array(extractor.base_texture),
+        "times": extractor.stage_times,
+    }
+
+
+def compare(name, reference, fast, output_dir):
+    """
+    prints the differences and speedups of every stage and saves a heatmap of the texel differences
+
+    :return: True if both engines produced the same result
+    """
+    equal = True
+    print(name)
+    for stage in CULLING_STAGES:
+        if stage not in reference["faces"]:
+            continue
+        missing = len(reference["faces"][stage] - fast["faces"][stage])
+        additional = len(fast["faces"][stage] - reference["faces"][stage])
+        equal = equal and missing == 0 and additional == 0
+        print("  %s: %d faces, %d missing, %d additional" % (stage, len(reference["faces"][stage]), missing,
+                                                              additional))
+
+    common = reference["vertices"].keys() & fast["vertices"].keys()
+    deltas = [np.abs(np.array(reference["vertices"][i]) - np.array(fast["vertices"][i])).max() for i in common]
+    max_delta = max(deltas) if len(deltas) > 0 else 0.0
+    print("  projected vertices: %d compared, max delta %g pixels" % (len(common), max_delta))
+
+    difference = np.abs(reference["texture"].astype(int) - fast["texture"].astype(int)).sum(axis=2)
+    mismatches = int((difference > 0).sum())
+    equal = equal and mismatches == 0
+    print("  texels: %d mismatches" % mismatches)
+    # heatmap: mismatching texels in red, the brighter the larger the difference
+    heatmap = np.zeros(difference.shape + (3,), dtype=np.uint8)
+    heatmap[:, :, 0] = np.where(difference > 0, 64 + np.minimum(difference, 191), 0)
+    heatmap_path = os.path.join(output_dir, name + "_heatmap.png")
+    Image.fromarray(heatmap).save(heatmap_path)
+    print("  heatmap: " + heatmap_path)
+
+    for stage, reference_time in reference["times"].items():
+        fast_time = fast["times"].get(stage, 0.0)
+        speedup = reference_time / fast_time if fast_time > 0 else math.inf
+        print("  %s: reference %.4f s, fast %.4f s, speedup %.2f" % (stage, reference_time, fast_time, speedup))
+    return equal
+
+
+def main():
+    args = sys.argv[1:]
+    # copy mode and sampling of the fast engine
+    copy_mode = pop_option(args, "--copy-mode") or "transform_paste"
+    copy_sampling = pop_option(args, "--sampling") or "nearest"
+    if "--help" in args or len(args) > 1:
+        # arg is the directory for the heatmaps (argv[1])
+        print("Usage:")
+        print(sys.argv[0] + " [output_directory] [--copy-mode copy_mode] [--sampling sampling]")
+        return
+    output_dir = os.path.abspath(args[0]) if len(args) == 1 else os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+
+    examples = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+    previous = config.engine, config.copy_mode, config.copy_sampling
+    cwd = os.getcwd()
+    equal = True
+    with tempfile.TemporaryDirectory() as directory:
+        cases = {
+            "example": tuple(os.path.join(examples, f) for f in ("scene.obj", "camera.json", "image.png")),
+            "sphere": generate_case(directory, "sphere", 24, 48, [[0, 0, 0]], [0.5, 1, 4], (1280, 720), 1),
+            "occluded_spheres": generate_case(directory, "occluded_spheres", 16, 32, [[0, 0, 0], [-0.8, 0.3, 1.5]],
+                                              [1, 0.5, 5], (960, 960), 2),
+        }
+        # the extractor saves the texture in the working directory
+        os.chdir(directory)
+        try:
+            for name, case in cases.items():
+                reference = run(case, "reference", "bounding_box", "nearest")
+                fast = run(case, "fast", copy_mode, copy_sampling)
+                equal = compare(name, reference, fast, output_dir) and equal
+        finally:
+            os.chdir(cwd)
+            config.engine, config.copy_mode, config.copy_sampling = previous
+    print("engines are equivalent" if equal else "engines differ")
+
+
+if __name__ == "__main__":
+    main()
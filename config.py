@@ -1,3 +1,7 @@
+# number of processes to parse the obj file, large files are parsed in parallel with more than one process
+# the scene objects are created serially, so the speedup is limited to about 3 (with one core it's slower, see README)
+parser_processes = 1
+
 # size of generated texture
 texture_width = 1024
 texture_height = 1024
@@ -5,10 +9,32 @@ texture_height = 1024
 # generate RGBA texture to use for quality metric
 quality_mode = False
 
+# implementation of culling and projection: "reference" (pure python) or "fast" (vectorized)
+# the engines are compared by benchmark/equivalence.py
+engine = "reference"
+
+# pixel copy algorithm: "bounding_box" or "transform_paste" (vectorized)
+copy_mode = "bounding_box"
+# image sampling of transform_paste: "nearest" or "bilinear"
+copy_sampling = "nearest"
+# sample a prefiltered image pyramid instead of single pixels for faces with several image pixels per texel
+image_pyramid = False
+
 # occlusion culling config
 depth_buffer_width = 256
 depth_buffer_height = 256
 occlusion_culling_threshold = 0.1
+# select the depth buffer size and threshold from the projected faces, the values above are the maximum
+depth_buffer_auto = False
+# minimum number of buffer cells covered by the median face
+depth_buffer_auto_cells = 2
+# the self occlusion error is the depth change of the faces over this number of buffer cells
+depth_buffer_auto_margin = 1.5
+
+# progressive extraction: the texture and depth buffer size is divided by each scale, the last scale has to be 1
+progressive_levels = [8, 4, 2, 1]
+# time in seconds for the pixel copy of the first level (culling and projection aren't included)
+progressive_budget = 0.5
 
 # config for quality
 quality_blur = True
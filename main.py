@@ -3,25 +3,75 @@ import time
 from textureextractor.extractor import Extractor
 
 
+def pop_option(args, name):
+    """
+    removes an option with its value from the argument list
+
+    :param args: list of arguments
+    :param name: name of the option (e.g. "--mask")
+    :return: value of the option or None if it isn't given
+    """
+    if name not in args:
+        return None
+    idx = args.index(name)
+    if idx + 1 >= len(args):
+        raise ValueError("option " + name + " needs a value")
+    value = args[idx + 1]
+    del args[idx:idx + 2]
+    return value
+
+
+def save_preview(scale, texture):
+    """
+    callback of the progressive extraction
+
+    :param scale: the texture size of the level is reduced by this factor
+    :param texture: texture image of the level
+    """
+    texture.save("texture_preview.png")
+    print("preview 1/" + str(scale) + " --- %s seconds ---" % (time.time() - start_time))
+
+
 def main():
-    if "--help" in sys.argv or (len(sys.argv) != 4 and len(sys.argv) != 5):
+    args = sys.argv[1:]
+    # optional silhouette mask of the user in the image (image file or run-length encoded json file)
+    mask = pop_option(args, "--mask")
+    # optional path to a sparse partial texture which is saved instead of the whole texture (see merge.py)
+    partial = pop_option(args, "--partial")
+    # optional comma separated names of obj groups or objects, only their faces are extracted
+    groups = pop_option(args, "--groups")
+    if groups is not None:
+        groups = groups.split(",")
+    # optional progressive extraction, a preview of every level is saved (see config.progressive_levels)
+    progressive = "--progressive" in args
+    if progressive:
+        args.remove("--progressive")
+    if "--help" in args or (len(args) != 3 and len(args) != 4):
         # args are path to obj file (argv[1]), camera parameters in json file format (argv[2]),
         # the image file from which the texture should be extracted (argv[3])
         # and an optional base uv-texture which should be refined (argv[4])
         print("Usage:")
-        print(sys.argv[0] + " path_to_obj_file path_to_camera_json path_to_image [path_to_base_image]")
+        print(sys.argv[0] + " path_to_obj_file path_to_camera_json path_to_image [path_to_base_image]"
+                            " [--mask path_to_mask] [--partial path_to_partial_texture] [--progressive]"
+                            " [--groups name1,name2]")
         return
 
-    scene = sys.argv[1]
-    camera = sys.argv[2]
-    image = sys.argv[3]
-    if len(sys.argv) == 5:
-        base = sys.argv[4]
+    scene = args[0]
+    camera = args[1]
+    image = args[2]
+    if len(args) == 4:
+        base = args[3]
     else:
         base = None
 
-    extractor = Extractor(scene, camera, image, base)
-    extractor.extract()
+    extractor = Extractor(scene, camera, image, base, mask, partial, groups)
+    if progressive:
+        extractor.extract(save_preview)
+    else:
+        extractor.extract()
+
+    for key, value in extractor.statistics.items():
+        print(key + ": " + str(value))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+import sys
+import time
+
+from PIL import Image
+import numpy as np
+
+from main import pop_option
+from textureextractor import confidence
+from textureextractor.partial import reduce_partials
+
+
+def main():
+    args = sys.argv[1:]
+    # optional base uv-texture into which the partial textures are merged
+    base = pop_option(args, "--base")
+    # optional number of processes for the tree reduction
+    processes = pop_option(args, "--processes")
+    if "--help" in args or len(args) < 2:
+        # args are the path of the merged texture (argv[1]) and the paths to the partial textures (argv[2:])
+        print("Usage:")
+        print(sys.argv[0] + " path_to_texture path_to_partial_texture [path_to_partial_texture ...]"
+                            " [--base path_to_base_image] [--processes number_of_processes]")
+        return
+
+    texture_path = args[0]
+    partial = reduce_partials(args[1:], int(processes) if processes is not None else 1)
+
+    # only the final texture is dense
+    mode = 'RGBA' if partial.colors.shape[1] == 4 else 'RGB'
+    if base is not None:
+        texture = np.array(Image.open(base, mode='r').convert(mode))
+    else:
+        texture = np.zeros((partial.height, partial.width, partial.colors.shape[1]), dtype=np.uint8)
+    texture_confidence = confidence.read_confidence(base, partial.width, partial.height)
+    partial.apply(texture, texture_confidence)
+
+    Image.fromarray(texture, mode).save(texture_path)
+    confidence.save_confidence(texture_path, texture_confidence)
+    print("merged texels: " + str(len(partial.indices)))
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    main()
+    print("--- %s seconds ---" % (time.time() - start_time))
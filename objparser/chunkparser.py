@@ -0,0 +1,157 @@
+import mmap
+import os
+from array import array
+from multiprocessing import Pool
+
+import numpy as np
+
+from objparser.groups import build_groups
+
+
+def split_file(file_name, chunks):
+    """
+    splits a file into byte ranges which end with a newline
+
+    :param file_name: path to file
+    :param chunks: number of byte ranges
+    :return: list of (start, end)
+    """
+    size = os.path.getsize(file_name)
+    if size == 0:
+        return []
+    with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        bounds = [0]
+        for i in range(1, chunks):
+            newline = m.find(b'\n', max(bounds[-1], i * size // chunks))
+            if newline == -1:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+        if bounds[-1] != size:
+            bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def parse_chunk(file_name, start, end, encoding="utf-8"):
+    """
+    parses the lines of a byte range of an obj file into typed arrays
+    the indices of the faces are resolved like Parser.__parse_f, but a relative (negative) vertex index can only be
+    resolved locally. It is returned as index relative to the first vertex of the chunk and marked as relative.
+
+    :param file_name: path to obj file
+    :param start: first byte of the range
+    :param end: byte after the range
+    :param encoding: encoding of the object and group names
+    :return: dictionary of arrays and the object and group statements (group_events) as
+             (number of faces of the chunk before the statement, "o" or "g", name)
+    """
+    v, vt, vn = array('d'), array('d'), array('d')
+    face_v, face_vt, face_vn = array('q'), array('q'), array('q')
+    relative_v = array('b')
+    v_count = 0
+    group_events = []
+
+    with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        data = m[start:end]
+
+    for line in data.split(b'\n'):
+        split = line.split()
+        if len(split) < 2:
+            # empty line or no content
+            continue
+        prefix = split[0]
+        # parse all vertex, texture, normal and face lines, ignore the rest
+        if prefix == b'v':
+            if len(split) != 4:
+                raise ValueError("Vertex should have three dimensions")
+            v.extend([float(split[1]), float(split[2]), float(split[3])])
+            v_count += 1
+        elif prefix == b'vt':
+            if len(split) != 3:
+                raise ValueError("Texture coordinate should have two dimensions")
+            vt.extend([float(split[1]), float(split[2])])
+        elif prefix == b'vn':
+            if len(split) != 4:
+                raise ValueError("Normals should have three dimensions")
+            vn.extend([float(split[1]), float(split[2]), float(split[3])])
+        elif prefix == b'f':
+            # store the first, previous and current vertex for triangulation
+            first, prev, current = None, None, None
+            for i, vertex in enumerate(split[1:]):
+                parts = vertex.split(b'/')
+                if len(parts) != 3 or parts[1] == b'':
+                    # only "f v/vt/vn" is accepted
+                    raise ValueError("Vertices of faces should have texture coords and normals")
+
+                # same index calculation as Parser.__parse_f
+                v_idx = int(parts[0]) - 1
+                is_relative = v_idx < 0
+                if is_relative:
+                    # negative indices refer to the vertices parsed so far, resolve within chunk
+                    v_idx += v_count
+                prev = current
+                current = (v_idx, int(parts[1]) - 1, int(parts[2]) - 1, is_relative)
+                if i == 0:
+                    first = current
+                if i >= 2:
+                    # triangulate: vertex1, vertex2, vertex3, the normal of the first vertex is used for the face
+                    face_v.extend([first[0], prev[0], current[0]])
+                    face_vt.extend([first[1], prev[1], current[1]])
+                    face_vn.append(first[2])
+                    relative_v.extend([first[3], prev[3], current[3]])
+        elif prefix == b'o' or prefix == b'g':
+            # the name may contain whitespaces
+            name = line.split(maxsplit=1)[1].strip().decode(encoding)
+            group_events.append((len(face_vn), prefix.decode(encoding), name))
+
+    return {
+        "v": np.frombuffer(v, dtype=np.float64).reshape(-1, 3),
+        "vt": np.frombuffer(vt, dtype=np.float64).reshape(-1, 2),
+        "vn": np.frombuffer(vn, dtype=np.float64).reshape(-1, 3),
+        "face_v": np.frombuffer(face_v, dtype=np.int64).reshape(-1, 3),
+        "face_vt": np.frombuffer(face_vt, dtype=np.int64).reshape(-1, 3),
+        "face_vn": np.frombuffer(face_vn, dtype=np.int64),
+        "relative_v": np.frombuffer(relative_v, dtype=np.int8).reshape(-1, 3).astype(bool),
+        "group_events": group_events,
+    }
+
+
+def parse_file(file_name, processes=None, encoding="utf-8"):
+    """
+    parses an obj file in parallel: the memory mapped file is split into newline aligned byte ranges, every range is
+    parsed by a worker process into typed arrays. The relative vertex indices are resolved with the vertex count of the
+    previous ranges and the arrays are concatenated.
+
+    :param file_name: path to obj file
+    :param processes: number of worker processes (default: number of cpus)
+    :param encoding: encoding of the object and group names
+    :return: dictionary of arrays:
+        v (vertices x 3), vt (texture coords x 2), vn (normals x 3),
+        face_v (faces x 3), face_vt (faces x 3), face_vn (faces), face_groups (faces)
+        and the group names (groups) and face ranges of every group and object (group_ranges), see build_groups
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    # more ranges than processes to balance the load
+    ranges = split_file(file_name, processes * 4)
+    with Pool(processes) as pool:
+        chunks = pool.starmap(parse_chunk, [(file_name, start, end, encoding) for start, end in ranges])
+    if len(chunks) == 0:
+        chunks = [parse_chunk(file_name, 0, 0, encoding)]
+
+    # resolve relative vertex indices with the number of vertices of all previous chunks
+    offset = 0
+    face_offset = 0
+    group_events = []
+    for chunk in chunks:
+        face_v = chunk["face_v"].copy()
+        face_v[chunk["relative_v"]] += offset
+        chunk["face_v"] = face_v
+        offset += len(chunk["v"])
+        group_events.extend((face_idx + face_offset, kind, name) for face_idx, kind, name in chunk["group_events"])
+        face_offset += len(chunk["face_vn"])
+
+    arrays = {key: np.concatenate([chunk[key] for chunk in chunks])
+              for key in ("v", "vt", "vn", "face_v", "face_vt", "face_vn")}
+    arrays["groups"], arrays["face_groups"], arrays["group_ranges"] = build_groups(group_events, face_offset)
+    return arrays
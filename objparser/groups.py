@@ -0,0 +1,104 @@
+import numpy as np
+
+# name of the faces before the first object or group statement
+DEFAULT_GROUP = "default"
+
+
+def build_groups(events, face_count):
+    """
+    assigns every face to a group from the object (o) and group (g) statements of an obj file
+    the group of a face is the last group statement of the current object or the object itself if the object has no
+    group statement yet
+
+    :param events: list of (number of faces before the statement, "o" or "g", name) in file order
+    :param face_count: number of faces
+    :return: (list of group names, group id of every face as array, dictionary name --> list of face ranges (start, stop))
+             the dictionary contains the object names too, their ranges cover all faces of the object
+    """
+    names = [DEFAULT_GROUP]
+    ids = {DEFAULT_GROUP: 0}
+    object_names = []
+    object_ids = {}
+
+    # face index where a group or object starts and its id
+    group_starts, group_ids = [0], [0]
+    object_starts, object_ids_of_faces = [0], [-1]
+
+    current_object, current_group = None, None
+    for face_idx, kind, name in events:
+        if kind == "o":
+            current_object, current_group = name, None
+            if name not in object_ids:
+                object_ids[name] = len(object_names)
+                object_names.append(name)
+            object_starts.append(face_idx)
+            object_ids_of_faces.append(object_ids[name])
+        else:
+            current_group = name
+        label = current_group if current_group is not None else current_object
+        if label not in ids:
+            ids[label] = len(names)
+            names.append(label)
+        group_starts.append(face_idx)
+        group_ids.append(ids[label])
+
+    face_groups = __expand(group_starts, group_ids, face_count)
+    face_objects = __expand(object_starts, object_ids_of_faces, face_count)
+
+    group_ranges = {}
+    for group_id, start, stop in __ranges(face_groups):
+        group_ranges.setdefault(names[group_id], []).append((start, stop))
+    for object_id, start, stop in __ranges(face_objects):
+        # faces before the first object statement belong to no object
+        if object_id >= 0:
+            group_ranges.setdefault(object_names[object_id], []).append((start, stop))
+    # a name can be used for a group and an object
+    group_ranges = {name: __merge(ranges) for name, ranges in group_ranges.items()}
+    return names, face_groups, group_ranges
+
+
+def select(group_ranges, names):
+    """
+    :param group_ranges: dictionary name --> list of face ranges (see build_groups)
+    :param names: names of groups or objects
+    :return: sorted indices of all faces of the groups
+    """
+    selected = []
+    for name in names:
+        if name not in group_ranges:
+            raise ValueError("unknown group: " + str(name))
+        selected.extend(np.arange(start, stop) for start, stop in group_ranges[name])
+    if len(selected) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(selected))
+
+
+def __expand(starts, values, count):
+    """
+    :return: array of length count, every value is repeated from its start to the next start
+    """
+    starts = np.minimum(np.array(starts + [count], dtype=np.int64), count)
+    return np.repeat(np.array(values, dtype=np.int64), np.diff(starts))
+
+
+def __ranges(ids_of_faces):
+    """
+    :return: list of (id, start, stop) for every run of equal ids
+    """
+    if len(ids_of_faces) == 0:
+        return []
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(ids_of_faces)) + 1, [len(ids_of_faces)]])
+    return [(int(ids_of_faces[start]), int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def __merge(ranges):
+    """
+    :return: sorted list of ranges, overlapping and adjacent ranges are merged
+    """
+    merged = []
+    for start, stop in sorted(ranges):
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
@@ -1,6 +1,12 @@
+import gc
+
+import numpy as np
+
 from objparser.vertex import Vertex
 from objparser.face import Face
 from objparser.scene import Scene
+from objparser import chunkparser
+from objparser.groups import build_groups
 
 
 class Parser:
@@ -15,8 +21,33 @@ class Parser:
         self.texture_coords = []
         self.normals = []
         self.faces = []
+        # object and group statements as (number of faces before the statement, "o" or "g", name)
+        self.group_events = []
+
+    def parse(self, processes=1):
+        """
+        parses the obj file into a scene
+
+        :param processes: with more than one process the file is parsed in parallel (see parse_arrays)
+        :return: scene
+        """
+        # all created vertices and faces stay alive, so the garbage collector would only traverse them again and again
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if processes > 1:
+                return self.__build_scene(self.parse_arrays(processes))
+            return self.__parse_lines()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def __parse_lines(self):
+        """
+        parses the obj file line by line into a scene
 
-    def parse(self):
+        :return: scene
+        """
         lines = self.__line_generator(self.file_name, self.encoding)
         for line in lines:
             split = line.split()
@@ -33,7 +64,52 @@ class Parser:
                 self.__parse_vn(line)
             elif prefix == 'f':
                 self.__parse_f(line)
-        return Scene(self.vertices, self.texture_coords, self.normals, self.faces)
+            elif prefix == 'o' or prefix == 'g':
+                # the name may contain whitespaces
+                self.group_events.append((len(self.faces), prefix, line.split(maxsplit=1)[1].strip()))
+        groups, face_groups, group_ranges = build_groups(self.group_events, len(self.faces))
+        return Scene(self.vertices, self.texture_coords, self.normals, self.faces, groups, face_groups, group_ranges)
+
+    def parse_arrays(self, processes=None):
+        """
+        parses the obj file in parallel into typed arrays without creating vertex and face objects
+        the file is memory mapped and split into newline aligned ranges, which are parsed by worker processes
+        faces are triangulated and indexed like in parse
+
+        :param processes: number of worker processes (default: number of cpus)
+        :return: dictionary of numpy arrays:
+            v (vertices x 3), vt (texture coords x 2), vn (normals x 3),
+            face_v (faces x 3), face_vt (faces x 3), face_vn (faces), face_groups (faces)
+            and the group names (groups) and face ranges of every group and object (group_ranges), see build_groups
+        """
+        return chunkparser.parse_file(self.file_name, processes, self.encoding)
+
+    def __build_scene(self, arrays):
+        """
+        creates a scene from parsed arrays
+
+        :param arrays: arrays of parse_arrays
+        :return: scene
+        """
+        self.vertices = [Vertex(x, y, z) for x, y, z in arrays["v"].tolist()]
+        self.texture_coords = arrays["vt"].tolist()
+        self.normals = arrays["vn"].tolist()
+
+        # create the faces column by column, this avoids python work per face apart from the face object itself
+        face_v, face_vt = arrays["face_v"], arrays["face_vt"]
+        vertex1, vertex2, vertex3 = [list(map(self.vertices.__getitem__, face_v[:, i].tolist())) for i in range(3)]
+        self.faces = list(map(Face, vertex1, vertex2, vertex3, face_vt[:, 0].tolist(), face_vt[:, 1].tolist(),
+                              face_vt[:, 2].tolist(), arrays["face_vn"].tolist()))
+
+        # add the faces to every adjacent vertex: a stable sort of the vertex indices groups the faces by vertex and
+        # keeps the order of parse (face order, a face is added once per corner)
+        flat_v = face_v.ravel()
+        adjacent = list(map(self.faces.__getitem__, (np.argsort(flat_v, kind='stable') // 3).tolist()))
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(flat_v, minlength=len(self.vertices)))]).tolist()
+        for vertex, start, end in zip(self.vertices, bounds[:-1], bounds[1:]):
+            vertex.faces = adjacent[start:end]
+        return Scene(self.vertices, self.texture_coords, self.normals, self.faces,
+                     arrays["groups"], arrays["face_groups"], arrays["group_ranges"])
 
     @staticmethod
     def __line_generator(file_name, encoding):
@@ -1,3 +1,6 @@
+from objparser import groups as obj_groups
+
+
 class Scene:
     """
     class represents a 3D-Scene build of triangular meshes
@@ -6,13 +9,51 @@ class Scene:
      a list of texture coordinates
      a list of normals
      a list of faces
+     a list of group names, the group id of every face and the face ranges of every group and object name
     """
 
-    def __init__(self, v, vt, vn, f):
+    def __init__(self, v, vt, vn, f, groups=None, face_groups=None, group_ranges=None):
         self.vertices = v
         self.texture_coords = vt
         self.normals = vn
         self.faces = f
+        if groups is None:
+            # all faces belong to the default group
+            groups, face_groups, group_ranges = obj_groups.build_groups([], len(f))
+        self.groups = groups
+        self.face_groups = face_groups
+        self.group_ranges = group_ranges
+
+    def group_faces(self, names):
+        """
+        note: the face ranges refer to the parsed faces, so this method has to be called before faces are removed
+
+        :param names: names of groups or objects (see group_ranges)
+        :return: list of the faces of the groups or objects
+        """
+        return [self.faces[i] for i in obj_groups.select(self.group_ranges, names).tolist()]
+
+    def snapshot(self):
+        """
+        saves the current state of the scene, so faces can be removed temporarily (e.g. by culling)
+        the normals and texture coordinates are not part of the snapshot
+
+        :return: snapshot which can be passed to restore
+        """
+        return list(self.faces), list(self.vertices), [(v, list(v.faces), v.pos) for v in self.vertices]
+
+    def restore(self, snapshot):
+        """
+        restores the state of a snapshot
+
+        :param snapshot: snapshot created by the snapshot method
+        """
+        faces, vertices, vertex_states = snapshot
+        self.faces = list(faces)
+        self.vertices = list(vertices)
+        for v, vertex_faces, pos in vertex_states:
+            v.faces = list(vertex_faces)
+            v.pos = pos
 
     def save_to_file(self, file_path):
         """method to save scene as a obj file"""
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+
+
+def confidence_path(texture_path):
+    """
+    the confidence map is stored as a sidecar file next to the texture
+    e.g. texture.png --> texture_confidence.npy
+
+    :param texture_path: path to texture file
+    :return: path to confidence file
+    """
+    return os.path.splitext(texture_path)[0] + "_confidence.npy"
+
+
+def read_confidence(texture_path, width, height):
+    """
+    reads the confidence map of a texture
+    if there is no confidence map every texel has confidence 0, so every texel will be overwritten by a visible face
+
+    :param texture_path: path to texture file (optional)
+    :param width: width of the texture
+    :param height: height of the texture
+    :return: confidence of every texel as 2D float array (rows x columns)
+    """
+    if texture_path is None or not os.path.isfile(confidence_path(texture_path)):
+        return np.zeros((height, width), dtype=np.float32)
+    confidence = np.load(confidence_path(texture_path))
+    if confidence.shape != (height, width):
+        raise ValueError("confidence map should have the same size as the texture")
+    return confidence.astype(np.float32)
+
+
+def save_confidence(texture_path, confidence):
+    """
+    :param texture_path: path to texture file
+    :param confidence: confidence map of the texture
+    """
+    np.save(confidence_path(texture_path), confidence)
+
+
+def view_angles(faces, normals, cop):
+    """
+    cosine of the angle between the face normal and the direction to the center of projection for every face
+    note: the scene has to be in world coordinates (see culler.cull_backfaces)
+
+    :param faces: faces for which the angles should be calculated
+    :param normals: normals of the scene
+    :param cop: center of projection
+    :return: list of cosines of the viewing angles
+    """
+    if len(faces) == 0:
+        return []
+    # take first vertex as point on mesh
+    p = np.array([face.vertices[0].pos for face in faces], dtype=float)
+    pcop = np.array(cop) - p
+    pcop = pcop / np.linalg.norm(pcop, axis=1)[:, None]
+
+    normal = np.array(normals, dtype=float)[[face.vn_idx for face in faces]]
+    normal = normal / np.linalg.norm(normal, axis=1)[:, None]
+    return (normal * pcop).sum(axis=1).tolist()
+
+
+def face_confidence(cos_angle, image_area, texture_area):
+    """
+    quality of the texels which are extracted for a face from the current view
+    the confidence is the product of
+     - the viewing angle: steep faces are distorted
+     - the projected texel density: with less than one image pixel per texel, neighbouring texels share a pixel.
+       The density also covers the depth, as the projected area of a face decreases with its distance.
+    the confidence is between 0 and 1
+
+    all parameters can be arrays to calculate the confidence of several faces at once
+
+    :param cos_angle: cosine of the angle between face normal and view direction
+    :param image_area: area of the face on the image in pixels
+    :param texture_area: area of the face on the texture in texels
+    :return: confidence of the face
+    """
+    density = np.minimum(1.0, np.abs(image_area) / np.abs(texture_area))
+    # round to the precision of the confidence map, so the confidence of a face is comparable to the stored values
+    return np.float32(np.maximum(0.0, cos_angle) * density)
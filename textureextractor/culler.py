@@ -60,20 +60,72 @@ def cull_frustum(scene):
         scene.faces.remove(f)
 
 
-def cull_occluded(scene):
+def cull_silhouette(scene, silhouette):
+    """
+    cull after perspective projection (see cull_frustum)
+    removes faces whose footprint on the image lies completely outside the silhouette of the user
+
+    :param scene: scene from which faces on the background should be removed
+    :param silhouette: silhouette mask with the size of the image
+    :return: number of removed faces
+    """
+    width = silhouette.width
+    height = silhouette.height
+
+    faces_to_discard = []
+    for face in scene.faces:
+        # same transformation as the screen transformation of the viewing pipeline
+        image_pos = [[(v.pos[0] + 1) * width / 2, (1 - v.pos[1]) * height / 2] for v in face.vertices]
+        if not silhouette.covers_triangle(image_pos[0], image_pos[1], image_pos[2]):
+            __remove_face_from_vertices(scene, face)
+            faces_to_discard.append(face)
+    for f in faces_to_discard:
+        scene.faces.remove(f)
+    return len(faces_to_discard)
+
+
+def cull_unselected(scene, selected_faces):
+    """
+    cull after occlusion culling: all faces are rendered into the depth buffer, but only the selected faces are copied
+    removes faces which don't belong to the selected groups or objects
+
+    :param scene: scene from which unselected faces should be removed
+    :param selected_faces: set of selected faces
+    :return: number of removed faces
+    """
+    faces_to_discard = [face for face in scene.faces if face not in selected_faces]
+    vertices_to_discard = set()
+    for face in faces_to_discard:
+        for v in face.vertices:
+            # remove face reference from vertex
+            v.faces.remove(face)
+            if len(v.faces) == 0:
+                vertices_to_discard.add(v)
+    scene.vertices = [v for v in scene.vertices if v not in vertices_to_discard]
+    scene.faces = [face for face in scene.faces if face in selected_faces]
+    return len(faces_to_discard)
+
+
+def cull_occluded(scene, buffer_width=None, buffer_height=None, threshold=None):
     """
     removes occluded faces via z-buffer
 
     :param scene: scene from which occluded faces should be removed
+    :param buffer_width: width of the depth buffer (optional, default see config)
+    :param buffer_height: height of the depth buffer (optional, default see config)
+    :param threshold: occlusion culling threshold (optional, default see config)
     """
     # this values effect the performance: higher resolution slows down the application but increases the correctness of
     # the z buffer. Scenes with close occluding faces need a higher resolution.
-    buffer_width = config.depth_buffer_width
-    buffer_height = config.depth_buffer_height
+    if buffer_width is None:
+        buffer_width = config.depth_buffer_width
+    if buffer_height is None:
+        buffer_height = config.depth_buffer_height
     # threshold to prevent self occlusion resulting from discrete steps in depth buffer.
     # with a higher threshold the resolution can be reduced. The best threshold depends on the model (distances between
     # occluded faces)
-    threshold = config.occlusion_culling_threshold
+    if threshold is None:
+        threshold = config.occlusion_culling_threshold
 
     # calculate the position of each vertex on the buffer
     buffer_vertices = __calculate_buffer_pos(scene, buffer_width, buffer_height)
@@ -0,0 +1,87 @@
+import numpy as np
+
+import config
+
+# smallest depth buffer size which is selected
+MIN_BUFFER_SIZE = 16
+
+
+def face_positions(scene):
+    """
+    :param scene: scene with triangular faces
+    :return: positions of the vertices of every face (faces x 3 x 3)
+    """
+    return np.array([[v.pos for v in face.vertices] for face in scene.faces], dtype=float)
+
+
+def tune(positions, max_width=None, max_height=None, threshold=None):
+    """
+    selects the depth buffer size and occlusion culling threshold for a scene
+    the size is halved as long as the median face still covers config.depth_buffer_auto_cells buffer cells and the
+    self occlusion error fits into the threshold. The error is the depth change of the faces over
+    config.depth_buffer_auto_margin buffer cells (99th percentile): a vertex can be compared with the depth of a
+    neighbouring cell position. If the error is larger than the threshold at the maximum size, the error is returned as
+    threshold. A smaller threshold isn't selected: it depends on the distances between occluding faces, which aren't
+    known, and removes visible faces with many faces per cell.
+
+    :param positions: positions of the vertices of every face in perspective coordinates after frustum culling
+                      (faces x 3 x 3, see face_positions)
+    :param max_width: maximum width of the depth buffer (optional, default see config)
+    :param max_height: maximum height of the depth buffer (optional, default see config)
+    :param threshold: occlusion culling threshold (optional, default see config)
+    :return: (buffer width, buffer height, threshold)
+    """
+    if max_width is None:
+        max_width = config.depth_buffer_width
+    if max_height is None:
+        max_height = config.depth_buffer_height
+    if threshold is None:
+        threshold = config.occlusion_culling_threshold
+    if len(positions) == 0:
+        return max_width, max_height, threshold
+
+    pos = positions
+    # extent of the faces in perspective coordinates, the buffer covers [-1, 1]
+    extent_x = pos[:, :, 0].max(axis=1) - pos[:, :, 0].min(axis=1)
+    extent_y = pos[:, :, 1].max(axis=1) - pos[:, :, 1].min(axis=1)
+    depth_range = pos[:, :, 2].max(axis=1) - pos[:, :, 2].min(axis=1)
+
+    width, height = max_width, max_height
+    threshold = max(threshold, __threshold(extent_x, extent_y, depth_range, width, height))
+    while min(width, height) // 2 >= MIN_BUFFER_SIZE:
+        # face size in buffer cells at half the resolution
+        cells = np.maximum(extent_x * (width // 2) / 2, extent_y * (height // 2) / 2)
+        if np.median(cells) < config.depth_buffer_auto_cells:
+            break
+        if __threshold(extent_x, extent_y, depth_range, width // 2, height // 2) > threshold:
+            break
+        width, height = width // 2, height // 2
+    return width, height, threshold
+
+
+def rasterization_work(positions, buffer_width, buffer_height):
+    """
+    estimates the work of the depth buffer rasterization: the number of tested bounding box cells and one unit per face
+
+    :param positions: positions of the vertices of every face in perspective coordinates (faces x 3 x 3)
+    :param buffer_width: width of the depth buffer
+    :param buffer_height: height of the depth buffer
+    :return: estimated work
+    """
+    if len(positions) == 0:
+        return 0
+    pos = positions
+    columns = np.floor(pos[:, :, 0] * (buffer_width / 2) + buffer_width / 2)
+    rows = np.floor(pos[:, :, 1] * (buffer_height / 2) + buffer_height / 2)
+    cells = (columns.max(axis=1) - columns.min(axis=1) + 1) * (rows.max(axis=1) - rows.min(axis=1) + 1)
+    return int(cells.sum()) + len(pos)
+
+
+def __threshold(extent_x, extent_y, depth_range, buffer_width, buffer_height):
+    """
+    :return: self occlusion error of nearly all faces at a buffer size
+    """
+    # a face smaller than a cell changes its whole depth range within one cell
+    cells = np.maximum(np.maximum(extent_x * buffer_width / 2, extent_y * buffer_height / 2), 1)
+    return float(np.percentile(depth_range / cells, 99) * config.depth_buffer_auto_margin)
+
@@ -1,30 +1,68 @@
 import json
 import math
+import time
 
 from PIL import Image
 import numpy as np
 
 from objparser.parser import Parser
-from textureextractor.viewingpipeline import Pipeline
+from textureextractor.viewingpipeline import Pipeline, FastPipeline
+from textureextractor.silhouette import read_silhouette
 from textureextractor import culler
+from textureextractor import fastculler
+from textureextractor import confidence
+from textureextractor.partial import PartialTexture
+from textureextractor import transformpaste
+from textureextractor import depthtuning
+from textureextractor.pyramid import ImagePyramid
 import config
 
 
 class Extractor:
 
-    def __init__(self, obj_file, camera_file, image_file, base_file=None):
+    def __init__(self, obj_file, camera_file, image_file, base_file=None, mask_file=None, partial_file=None,
+                 groups=None):
         self.scene = self.__read_obj(obj_file)
+        # if groups are given, only the faces of the selected groups or objects are extracted (see extract)
+        self.selected_faces = set(self.scene.group_faces(groups)) if groups is not None else None
         self.camera = self.__read_camera(camera_file)
-        self.image = self.__read_image(image_file)
+        self.silhouette = self.__read_silhouette(mask_file)
+        # only the part of the image within the silhouette's bounding box is converted to RGB
+        self.image, self.image_box, self.image_width, self.image_height = self.__read_image(
+            image_file, self.silhouette)
         self.base_texture = self.__read_base(base_file)
+        # quality of every texel of the base texture, only texels which can be improved are overwritten
+        self.confidence = confidence.read_confidence(base_file, self.base_texture.width, self.base_texture.height)
+        # cosine of the viewing angle of every face (see extract)
+        self.view_angles = {}
+        # texels written by this extraction (see __copy_pixel)
+        self.written = None
+        # if a path to a partial texture is given, only the written texels are saved instead of the whole texture
+        self.partial_file = partial_file
+
+        # statistics about the saved work
+        self.statistics = {}
+        # time in seconds of every stage of the extraction
+        self.stage_times = {}
+        # if trace is set, the remaining faces after every stage are stored in stage_faces (see benchmark.equivalence)
+        self.trace = False
+        self.stage_faces = {}
+        if self.selected_faces is not None:
+            self.statistics["selected_faces"] = len(self.selected_faces)
+            self.statistics["unselected_faces"] = len(self.scene.faces) - len(self.selected_faces)
+        if self.silhouette is not None:
+            if (self.silhouette.width, self.silhouette.height) != (self.image_width, self.image_height):
+                raise ValueError("silhouette mask should have the same size as the image")
+            self.statistics["image_pixels"] = self.image_width * self.image_height
+            self.statistics["converted_pixels"] = self.image.width * self.image.height
 
         # take image aspect ratio as camera's aspect ratio
-        self.camera["aspect_ratio"] = self.image.width / self.image.height
+        self.camera["aspect_ratio"] = self.image_width / self.image_height
         # calculate vertical fov from horizontal fov and aspect ratio
         self.camera["fov_vertical"] = self.__calculate_vertical_fov(
             self.camera["fov_horizontal"], self.camera["aspect_ratio"])
 
-    def extract(self):
+    def extract(self, callback=None):
         """
         extract a texture
         steps:
@@ -32,49 +70,208 @@ class Extractor:
          2. apply view transformation to scene
          3. perspective transformation
          4. cull faces outside the view frustum
-         5. occlusion culling
+         5. cull faces outside the silhouette (optional)
          6. screen transformation
-         7. copy pixels
+            (with config.depth_buffer_auto the depth buffer size and threshold are selected before, see depthtuning)
+         7. occlusion culling
+         8. cull faces outside the selected groups (optional), all faces are occluders in step 7
+         9. copy pixels
+
+        if a callback is given, the texture is extracted progressively: steps 7 to 9 are executed for every level of
+        config.progressive_levels with a reduced texture and depth buffer resolution, the results of steps 1 to 6 are
+        reused for every level. The pixel copy of the first level stops after config.progressive_budget seconds, but
+        copies at least one face (or one batch of faces with transform_paste); the culling isn't part of the budget.
+
+        :param callback: function which is called with the scale and the texture image of every level (optional)
         """
+        stage_start = time.time()
+
+        # the reference engine is the pure python implementation, the fast engine is vectorized
+        if config.engine == "reference":
+            face_culler, pipeline_class = culler, Pipeline
+        elif config.engine == "fast":
+            face_culler, pipeline_class = fastculler, FastPipeline
+        else:
+            raise ValueError("unknown engine: " + str(config.engine))
 
         # backface culling with camera as cop
-        culler.cull_backfaces(self.scene, self.camera["position"])
+        face_culler.cull_backfaces(self.scene, self.camera["position"])
+        # the viewing angle is needed for the confidence of the extracted texels, the scene is still in world coos
+        self.view_angles = dict(zip(self.scene.faces, confidence.view_angles(
+            self.scene.faces, self.scene.normals, self.camera["position"])))
+        stage_start = self.__record_stage("backface_culling", stage_start)
 
         # use list comprehension to extract only vertex coordinates
-        pipeline = Pipeline(self.camera, [v.pos for v in self.scene.vertices], self.scene.normals)
+        pipeline = pipeline_class(self.camera, [v.pos for v in self.scene.vertices], self.scene.normals)
         pipeline.apply_view_transformation()
 
         # perspective transfomation
         pipeline.apply_perspective_transformation()
-
-        # frustum culling
         pipeline.apply_to_scene(self.scene)
-        culler.cull_frustum(self.scene)
+        stage_start = self.__record_stage("projection", stage_start)
 
-        # occlusion culling
-        culler.cull_occluded(self.scene)
-
-        # screen transformation
+        # frustum culling
+        face_culler.cull_frustum(self.scene)
+        stage_start = self.__record_stage("frustum_culling", stage_start)
+
+        # silhouette culling, this reduces the faces which have to be rendered into the depth buffer
+        if self.silhouette is not None:
+            self.statistics["faces_rejected_by_mask"] = face_culler.cull_silhouette(self.scene, self.silhouette)
+            stage_start = self.__record_stage("silhouette_culling", stage_start)
+
+        buffer_width, buffer_height = config.depth_buffer_width, config.depth_buffer_height
+        threshold = config.occlusion_culling_threshold
+        if config.depth_buffer_auto:
+            # smallest depth buffer and threshold for the projected faces
+            positions = depthtuning.face_positions(self.scene)
+            buffer_width, buffer_height, threshold = depthtuning.tune(positions)
+            full_work = depthtuning.rasterization_work(positions, config.depth_buffer_width,
+                                                       config.depth_buffer_height)
+            tuned_work = depthtuning.rasterization_work(positions, buffer_width, buffer_height)
+            self.statistics["depth_buffer_size"] = "%dx%d" % (buffer_width, buffer_height)
+            self.statistics["occlusion_culling_threshold"] = threshold
+            stage_start = self.__record_stage("depth_buffer_tuning", stage_start)
+
+        # screen transformation, the occlusion culling needs the perspective positions, so the screen positions are
+        # applied after the occlusion culling
         pipeline.set_vertices([v.pos for v in self.scene.vertices])
-        pipeline.apply_screen_transformation(self.image.width, self.image.height)
-        pipeline.apply_to_scene(self.scene)
+        pipeline.apply_screen_transformation(self.image_width, self.image_height)
+        screen_positions = dict(zip(self.scene.vertices, pipeline.get_vertices()))
+        stage_start = self.__record_stage("screen_transformation", stage_start)
+
+        levels = config.progressive_levels if callback is not None else [1]
+        if levels[-1] != 1:
+            raise ValueError("last progressive level should have the full resolution (scale 1)")
+        snapshot = self.scene.snapshot()
+        texture = None
+        # prefiltered image for faces with several image pixels per texel, built once for all levels
+        pyramid = ImagePyramid(np.array(self.image)) if config.image_pyramid else None
+        for i, scale in enumerate(levels):
+            if i > 0:
+                # every level starts with the faces which survived the frustum and silhouette culling
+                self.scene.restore(snapshot)
+
+            # occlusion culling
+            occlusion_start = time.time()
+            face_culler.cull_occluded(self.scene, max(1, buffer_width // scale), max(1, buffer_height // scale),
+                                      threshold)
+            occlusion_time = time.time() - occlusion_start
+
+            for v in self.scene.vertices:
+                v.pos = screen_positions[v]
+            stage_start = self.__record_stage("occlusion_culling", stage_start)
+            if config.depth_buffer_auto and scale == 1:
+                self.statistics["occlusion_culling_seconds"] = round(occlusion_time, 4)
+                # the rasterization time is about proportional to the tested buffer cells, nothing is saved without faces
+                saved = occlusion_time * (full_work / tuned_work - 1) if tuned_work > 0 else 0.0
+                tuning_time = round(self.stage_times["depth_buffer_tuning"], 4)
+                self.statistics["depth_buffer_tuning_seconds"] = tuning_time
+                # net saving: the tuning costs time too, a negative value is a loss
+                self.statistics["occlusion_culling_estimated_seconds_saved"] = round(round(saved, 4) - tuning_time, 4)
+
+            if self.selected_faces is not None:
+                # unselected faces occlude the selected faces, but their pixels aren't copied
+                face_culler.cull_unselected(self.scene, self.selected_faces)
+                stage_start = self.__record_stage("group_culling", stage_start)
+
+            if scale == 1:
+                # the full resolution refines the base texture
+                texture = np.array(self.base_texture)
+                texture_confidence = self.confidence
+            else:
+                # coarse levels refine the upsampled texture of the previous level
+                texture, texture_confidence = self.__scale_texture(texture, scale)
+            # only the copy of the first level is budgeted, so slow culling doesn't leave the first preview blank
+            deadline = time.time() + config.progressive_budget if i == 0 and len(levels) > 1 else None
+
+            # copy pixels from image to texture image
+            if config.copy_mode == "bounding_box":
+                self.written = self.__copy_pixel(texture, texture_confidence, pyramid, deadline)
+            elif config.copy_mode == "transform_paste":
+                self.written = self.__transform_and_paste(texture, texture_confidence, pyramid, deadline)
+            else:
+                raise ValueError("unknown copy mode: " + str(config.copy_mode))
+            stage_start = self.__record_stage("copy", stage_start)
+
+            if callback is not None:
+                callback(scale, Image.fromarray(texture))
 
-        # copy pixels from image to texture image
-        self.__copy_pixel()
+        self.base_texture = Image.fromarray(texture)
+
+        if self.partial_file is not None:
+            # save only written texels, the partial textures of several extractions are merged later
+            partial = PartialTexture.from_texture(texture, self.confidence, self.written)
+            partial.save(self.partial_file)
+            return
 
-        # save texture in file
+        # save texture and its confidence in file
         self.base_texture.save("texture.png")
+        confidence.save_confidence("texture.png", self.confidence)
 
-    def __copy_pixel(self):
+    def __record_stage(self, name, stage_start):
+        """
+        adds the time of a stage to stage_times and stores the remaining faces if trace is set
+
+        :param name: name of the stage
+        :param stage_start: start time of the stage
+        :return: end time of the stage
+        """
+        stage_end = time.time()
+        self.stage_times[name] = self.stage_times.get(name, 0) + stage_end - stage_start
+        if self.trace:
+            self.stage_faces[name] = list(self.scene.faces)
+        return stage_end
+
+    def __scale_texture(self, previous_texture, scale):
+        """
+        creates the texture and confidence map of a coarse progressive level
+
+        :param previous_texture: texture of the previous level or None for the first level
+        :param scale: the texture size is reduced by this factor
+        :return: texture and confidence map of the level
+        """
+        width = max(1, self.base_texture.width // scale)
+        height = max(1, self.base_texture.height // scale)
+        if previous_texture is None:
+            texture = np.array(self.base_texture.resize((width, height), Image.NEAREST))
+        else:
+            texture = np.array(Image.fromarray(previous_texture).resize((width, height), Image.NEAREST))
+        # nearest texel of the confidence map of the base texture
+        rows = np.arange(height) * self.confidence.shape[0] // height
+        columns = np.arange(width) * self.confidence.shape[1] // width
+        return texture, self.confidence[np.ix_(rows, columns)]
+
+    def __copy_pixel(self, texture, texture_confidence, pyramid=None, deadline=None):
+        """
+        copies the pixels of the image onto the texture for every face of the scene
+
+        :param texture: texture array, changed in place
+        :param texture_confidence: confidence map of the texture, changed in place
+        :param pyramid: image pyramid of the image (optional, see config.image_pyramid)
+        :param deadline: the copy stops when this time is reached (optional)
+        :return: boolean array which is True for every written texel
+        """
         # convert images to arrays for better performance
-        im = np.array(self.image)
-        texture = np.array(self.base_texture)
+        im = np.array(self.image) if pyramid is None else pyramid.levels[0]
+
+        # the image is cropped to the bounding box of the silhouette
+        image_left = self.image_box[0]
+        image_top = self.image_box[1]
+        mask = self.silhouette.mask if self.silhouette is not None else None
+        skipped_texels = 0
+        skipped_faces = 0
+        written = np.zeros(texture_confidence.shape, dtype=bool)
 
         # get size of images only once to increase performance
         texture_width = texture.shape[1]
         texture_height = texture.shape[0]
 
-        for f in self.scene.faces:
+        for i, f in enumerate(self.scene.faces):
+            if deadline is not None and i > 0 and time.time() > deadline:
+                # the remaining faces are copied by the next level
+                self.statistics["preview_faces_skipped_by_budget"] = len(self.scene.faces) - i
+                break
+
             texture_pos = []
             image_pos = []
 
@@ -111,6 +308,18 @@ class Extractor:
             if total_area == 0.0:
                 continue
 
+            # quality of the texels extracted from the current view
+            image_area = self.__triangle_area(v1, v2, v3)
+            face_confidence = confidence.face_confidence(self.view_angles[f], image_area, total_area)
+            if not self.__is_face_improvable(texture_confidence, face_confidence, vt1, vt2, vt3,
+                                         min_x, max_x, min_y, max_y):
+                skipped_faces += 1
+                continue
+
+            # the pyramid level is selected from the footprint of a texel, a level pixel covers 2^level image pixels
+            level = int(pyramid.level(image_area, total_area)) if pyramid is not None else 0
+            im_level = pyramid.levels[level] if pyramid is not None else im
+
             # iterate all pixels of the bounding box
             for x in range(min_x, max_x):
                 for y in range(min_y, max_y):
@@ -141,11 +350,108 @@ class Extractor:
                         x_image = math.floor(alpha * v1[0] + beta * v2[0] + gamma * v3[0])
                         y_image = math.floor(alpha * v1[1] + beta * v2[1] + gamma * v3[1])
 
+                        if mask is not None and not mask[y_image][x_image]:
+                            # source pixel is background
+                            skipped_texels += 1
+                            continue
+
+                        if texture_confidence[y_texture][x_texture] >= face_confidence:
+                            # texel was already extracted from an equal or better view
+                            continue
+
                         # copy pixel [y_image, x_image] to [y_texture, x_texture]
-                        pixel = im[y_image][x_image]
+                        pixel = im_level[(y_image - image_top) >> level][(x_image - image_left) >> level]
                         texture[y_texture][x_texture] = pixel
+                        texture_confidence[y_texture][x_texture] = face_confidence
+                        written[y_texture][x_texture] = True
 
-        self.base_texture = Image.fromarray(texture)
+        self.statistics["faces_skipped_by_confidence"] = skipped_faces
+        if mask is not None:
+            self.statistics["texels_skipped_by_mask"] = skipped_texels
+        return written
+
+    def __transform_and_paste(self, texture, texture_confidence, pyramid=None, deadline=None):
+        """
+        copies the image triangle of every face at once onto the texture (see transformpaste.paste)
+        in contrast to __copy_pixel all faces are processed vectorized
+
+        :param texture: texture array, changed in place
+        :param texture_confidence: confidence map of the texture, changed in place
+        :param pyramid: image pyramid of the image (optional, see config.image_pyramid)
+        :param deadline: the copy stops when this time is reached (optional)
+        :return: boolean array which is True for every written texel
+        """
+        texture_width = texture.shape[1]
+        texture_height = texture.shape[0]
+        faces = self.scene.faces
+        if len(faces) == 0:
+            return np.zeros(texture_confidence.shape, dtype=bool)
+
+        # vertices on texture map and corresponding vertices on image for all faces (faces x 3 x 2)
+        texture_pos = np.array([[self.scene.texture_coords[i] for i in f.vt_indices] for f in faces], dtype=float)
+        # texture coordinate is given from lower left corner but image coordinates start on upper left corner
+        texture_pos[:, :, 0] = texture_width * texture_pos[:, :, 0]
+        texture_pos[:, :, 1] = texture_height * (1 - texture_pos[:, :, 1])
+        image_pos = np.array([[v.pos[:2] for v in f.vertices] for f in faces], dtype=float)
+
+        texture_area = transformpaste.triangle_area(texture_pos[:, 0].T, texture_pos[:, 1].T, texture_pos[:, 2].T)
+        image_area = transformpaste.triangle_area(image_pos[:, 0].T, image_pos[:, 1].T, image_pos[:, 2].T)
+        # faces without area on the texture have no texels
+        valid = texture_area != 0.0
+        texture_pos, image_pos = texture_pos[valid], image_pos[valid]
+        view_angles = np.array([self.view_angles[f] for f in faces])[valid]
+        face_confidence = confidence.face_confidence(view_angles, image_area[valid], texture_area[valid])
+
+        affine = transformpaste.calculate_affine(texture_pos, image_pos)
+        mask = self.silhouette.mask if self.silhouette is not None else None
+        if pyramid is not None:
+            face_level = pyramid.level(image_area[valid], texture_area[valid])
+            levels = pyramid.levels
+        else:
+            face_level = np.zeros(len(texture_pos), dtype=np.int64)
+            levels = [np.array(self.image)]
+        written, skipped_texels, skipped_faces = transformpaste.paste(
+            levels, face_level, texture, texture_confidence, texture_pos, affine, face_confidence, self.image_box,
+            mask, config.copy_sampling, deadline)
+        if mask is not None:
+            self.statistics["texels_skipped_by_mask"] = skipped_texels
+        if skipped_faces > 0:
+            # the remaining faces are copied by the next level
+            self.statistics["preview_faces_skipped_by_budget"] = skipped_faces
+        return written
+
+    @classmethod
+    def __is_face_improvable(cls, texture_confidence, face_confidence, vt1, vt2, vt3, min_x, max_x, min_y, max_y):
+        """
+        checks vectorized whether any texel of a face has a lower confidence than the current view can offer
+
+        :param texture_confidence: confidence map of the texture
+        :param face_confidence: confidence of the face in the current view
+        :param vt1: first vertex on texture
+        :param vt2: second vertex on texture
+        :param vt3: third vertex on texture
+        :param min_x: left side of the bounding box on the texture
+        :param max_x: right side of the bounding box on the texture
+        :param min_y: top side of the bounding box on the texture
+        :param max_y: bottom side of the bounding box on the texture
+        :return: False if every texel of the face already has an equal or higher confidence
+        """
+        if max_x <= min_x or max_y <= min_y:
+            return False
+        texture_height, texture_width = texture_confidence.shape
+        # take center of pixel, same as in __copy_pixel
+        y, x = np.mgrid[min_y:max_y, min_x:max_x] + 0.5
+        total_area = cls.__triangle_area(vt1, vt2, vt3)
+        alpha = cls.__triangle_area(vt2, vt3, [x, y]) / total_area
+        beta = cls.__triangle_area(vt3, vt1, [x, y]) / total_area
+        gamma = cls.__triangle_area(vt1, vt2, [x, y]) / total_area
+        inside = (alpha >= 0) & (beta >= 0) & (gamma >= 0)
+        if not inside.any():
+            return True
+        # the texture map is a torus (see __copy_pixel)
+        rows = np.arange(min_y, max_y) % texture_height
+        columns = np.arange(min_x, max_x) % texture_width
+        return texture_confidence[np.ix_(rows, columns)][inside].min() < face_confidence
 
     @staticmethod
     def __triangle_area(a, b, c):
@@ -155,7 +461,7 @@ class Extractor:
     def __read_obj(obj_path):
         # use obj parser
         parser = Parser(obj_path)
-        scene = parser.parse()
+        scene = parser.parse(config.parser_processes)
         return scene
 
     @staticmethod
@@ -190,14 +496,38 @@ class Extractor:
         return camera
 
     @staticmethod
-    def __read_image(image_path):
+    def __read_silhouette(mask_path=None):
+        """
+        :param mask_path: path to image or run-length encoded json file of the user's silhouette (optional)
+        :return: silhouette or None if it isn't given
+        """
+        if mask_path is None:
+            return None
+        return read_silhouette(mask_path)
+
+    @staticmethod
+    def __read_image(image_path, silhouette=None):
+        """
+        opens the image, if a silhouette is given only the bounding box of the silhouette is converted
+
+        :param image_path: path to image file from which the texture is extracted
+        :param silhouette: silhouette of the user within the image (optional)
+        :return: (image, crop box as (left, top, right, bottom), width of full image, height of full image)
+        """
         if config.quality_mode:
             mode = 'RGBA'
         else:
             mode = 'RGB'
+        img = Image.open(image_path, mode='r')
+        width, height = img.size
+        box = (0, 0, width, height)
+        if silhouette is not None:
+            box = silhouette.bounding_box if silhouette.bounding_box is not None else (0, 0, 0, 0)
+            # crop before conversion, so only the relevant part is converted
+            img = img.crop(box)
         # open image and return pixel accessible format
-        img = Image.open(image_path, mode='r').convert(mode)
-        return img
+        img = img.convert(mode)
+        return img, box, width, height
 
     @staticmethod
     def __read_base(base_file=None):
@@ -0,0 +1,202 @@
+import numpy as np
+
+import config
+from textureextractor import culler
+
+# maximum number of buffer pixels which are rasterized at once by cull_occluded
+BATCH_PIXELS = 1 << 21
+
+
+def cull_backfaces(scene, cop):
+    """
+    vectorized version of culler.cull_backfaces
+
+    :param scene: scene from which backfaces should be removed
+    :param cop: center of projection
+    """
+    if len(scene.faces) == 0:
+        return
+    # take first vertex as point on mesh
+    p = np.array([face.vertices[0].pos for face in scene.faces], dtype=float)
+    # pcop: vector from cop to point p on triangle
+    pcop = np.array(cop) - p
+    pcop = pcop / np.linalg.norm(pcop, axis=1)[:, None]
+
+    normals = np.array(scene.normals, dtype=float)[[face.vn_idx for face in scene.faces]]
+    normals = normals / np.linalg.norm(normals, axis=1)[:, None]
+
+    # cull back facing faces and faces with more than about 85 degree (cos(85) ~ 0.1)
+    __remove_faces(scene, (normals * pcop).sum(axis=1) <= 0.1)
+
+
+def cull_frustum(scene):
+    """
+    vectorized version of culler.cull_frustum
+
+    :param scene: scene from which faces outside the frustum should be removed
+    """
+    if len(scene.faces) == 0:
+        return
+    pos = __face_positions(scene)
+    x, y, z = pos[:, :, 0], pos[:, :, 1], pos[:, :, 2]
+    # if there is only one vertex outside: discard whole face
+    is_outside = ((x < -1) | (x > 1) | (y < -1) | (y > 1) | (z >= 0)).any(axis=1)
+    __remove_faces(scene, is_outside)
+
+
+def cull_silhouette(scene, silhouette):
+    """
+    vectorized version of culler.cull_silhouette
+    the bounding boxes of all faces are tested at once, only partly covered faces are tested exactly
+    (see Silhouette.covers_triangles)
+
+    :param scene: scene from which faces on the background should be removed
+    :param silhouette: silhouette mask with the size of the image
+    :return: number of removed faces
+    """
+    if len(scene.faces) == 0:
+        return 0
+    pos = __face_positions(scene)
+    # same transformation as the screen transformation of the viewing pipeline (faces x 3 x 2)
+    image_pos = np.stack([(pos[:, :, 0] + 1) * silhouette.width / 2, (1 - pos[:, :, 1]) * silhouette.height / 2],
+                         axis=2)
+    on_background = ~silhouette.covers_triangles(image_pos[:, 0], image_pos[:, 1], image_pos[:, 2])
+    __remove_faces(scene, on_background)
+    return int(on_background.sum())
+
+
+def cull_unselected(scene, selected_faces):
+    """
+    the group selection is already a set lookup per face (see culler.cull_unselected)
+
+    :param scene: scene from which unselected faces should be removed
+    :param selected_faces: set of selected faces
+    :return: number of removed faces
+    """
+    return culler.cull_unselected(scene, selected_faces)
+
+
+def cull_occluded(scene, buffer_width=None, buffer_height=None, threshold=None):
+    """
+    vectorized version of culler.cull_occluded
+    the depth buffer is rasterized for many faces at once: the pixels of the bounding boxes of all faces are enumerated
+    in one array and the depth of the pixels within the faces is written with np.minimum.at
+
+    :param scene: scene from which occluded faces should be removed
+    :param buffer_width: width of the depth buffer (optional, default see config)
+    :param buffer_height: height of the depth buffer (optional, default see config)
+    :param threshold: occlusion culling threshold (optional, default see config)
+    """
+    if buffer_width is None:
+        buffer_width = config.depth_buffer_width
+    if buffer_height is None:
+        buffer_height = config.depth_buffer_height
+    if threshold is None:
+        threshold = config.occlusion_culling_threshold
+    if len(scene.faces) == 0:
+        return
+
+    # buffer position of each vertex (faces x 3), see culler.__calculate_buffer_pos
+    pos = __face_positions(scene)
+    columns = np.floor(pos[:, :, 0] * (buffer_width / 2) + buffer_width / 2).astype(np.int64)
+    rows = np.floor(pos[:, :, 1] * (buffer_height / 2) + buffer_height / 2).astype(np.int64)
+    depth = pos[:, :, 2]
+
+    buffer = calculate_buffer(columns, rows, depth, buffer_width, buffer_height)
+
+    # if there is only one vertex occluded: discard whole face
+    is_occluded = (buffer[rows, columns] < np.abs(depth) - threshold).any(axis=1)
+    __remove_faces(scene, is_occluded)
+
+
+def calculate_buffer(columns, rows, depth, buffer_width, buffer_height):
+    """
+    calculates a depth buffer, same rasterization as culler.__calculate_buffer
+
+    :param columns: buffer column of every vertex (faces x 3)
+    :param rows: buffer row of every vertex (faces x 3)
+    :param depth: z value of every vertex (faces x 3)
+    :param buffer_width: width of the buffer
+    :param buffer_height: height of the buffer
+    :return: the calculated depth buffer
+    """
+    # init buffer with max distance
+    buffer = np.full((buffer_height, buffer_width), np.inf)
+
+    v0 = (columns[:, 0], rows[:, 0])
+    v1 = (columns[:, 1], rows[:, 1])
+    v2 = (columns[:, 2], rows[:, 2])
+    total_area = __triangle_area(v0, v1, v2)
+
+    # bounding boxes including the maximum
+    min_x, max_x = columns.min(axis=1), columns.max(axis=1)
+    min_y, max_y = rows.min(axis=1), rows.max(axis=1)
+    box_width = max_x - min_x + 1
+    pixels = np.where(total_area != 0.0, box_width * (max_y - min_y + 1), 0)
+
+    # split the faces into batches, so the enumerated pixels fit into memory
+    ends = np.cumsum(pixels)
+    start = 0
+    while start < len(pixels):
+        end = int(np.searchsorted(ends, (ends[start - 1] if start > 0 else 0) + BATCH_PIXELS, side='right'))
+        end = max(end, start + 1)
+        batch = np.arange(start, end)
+        start = end
+
+        # enumerate every pixel of the bounding boxes of the batch
+        counts = pixels[batch]
+        faces = np.repeat(batch, counts)
+        if len(faces) == 0:
+            continue
+        offsets = np.arange(len(faces)) - np.repeat(np.cumsum(counts) - counts, counts)
+        x = min_x[faces] + offsets % box_width[faces]
+        y = min_y[faces] + offsets // box_width[faces]
+        p = (x, y)
+
+        # calculate baryzentric coordinates from sub-triangle / total-triangle ratio
+        a = (v0[0][faces], v0[1][faces])
+        b = (v1[0][faces], v1[1][faces])
+        c = (v2[0][faces], v2[1][faces])
+        area = total_area[faces]
+        alpha = __triangle_area(b, c, p) / area
+        beta = __triangle_area(c, a, p) / area
+        gamma = __triangle_area(a, b, p) / area
+        inside = (alpha >= 0) & (beta >= 0) & (gamma >= 0)
+
+        z = np.abs(alpha * depth[faces, 0] + beta * depth[faces, 1] + gamma * depth[faces, 2])
+        np.minimum.at(buffer, (y[inside], x[inside]), z[inside])
+    return buffer
+
+
+def __triangle_area(a, b, c):
+    return 0.5 * ((a[0] - c[0]) * (b[1] - c[1]) - (a[1] - c[1]) * (b[0] - c[0]))
+
+
+def __face_positions(scene):
+    """
+    :param scene: scene with triangular faces
+    :return: positions of the vertices of every face (faces x 3 x 3)
+    """
+    return np.array([[v.pos for v in face.vertices] for face in scene.faces], dtype=float)
+
+
+def __remove_faces(scene, discard):
+    """
+    removes faces at once, same result as culler.__remove_face_from_vertices for every face
+    deletes the vertices without associated faces
+
+    :param scene: scene the faces belong to
+    :param discard: boolean array, True for every face of the scene which should be removed
+    """
+    faces_to_discard = [face for face, d in zip(scene.faces, discard.tolist()) if d]
+    if len(faces_to_discard) == 0:
+        return
+    vertices_to_discard = set()
+    for face in faces_to_discard:
+        for v in face.vertices:
+            # remove face reference from vertex
+            v.faces.remove(face)
+            if len(v.faces) == 0:
+                vertices_to_discard.add(v)
+    scene.vertices = [v for v in scene.vertices if v not in vertices_to_discard]
+    scene.faces = [face for face, d in zip(scene.faces, discard.tolist()) if not d]
@@ -0,0 +1,157 @@
+import struct
+from multiprocessing import Pool
+
+import numpy as np
+
+# header: magic, version, number of channels, texture width, texture height, number of texels
+HEADER = struct.Struct("<4sBBIIQ")
+MAGIC = b"PTEX"
+VERSION = 1
+
+
+class PartialTexture:
+    """
+    sparse texture which contains only the texels written by one or several extractions
+    every texel is stored with its flat index (row * width + column), its color and its confidence
+    the indices are sorted and unique
+    """
+
+    def __init__(self, width, height, indices, colors, confidence):
+        """
+        :param width: width of the texture
+        :param height: height of the texture
+        :param indices: flat indices of the texels
+        :param colors: colors of the texels (texels x channels)
+        :param confidence: confidence of the texels
+        """
+        self.width = width
+        self.height = height
+        self.indices = np.asarray(indices, dtype=np.uint32)
+        self.colors = np.asarray(colors, dtype=np.uint8)
+        self.confidence = np.asarray(confidence, dtype=np.float32)
+
+    @classmethod
+    def from_texture(cls, texture, confidence, written):
+        """
+        :param texture: texture array (rows x columns x channels)
+        :param confidence: confidence map of the texture
+        :param written: boolean array, True for every texel which should be part of the partial texture
+        :return: partial texture
+        """
+        height, width = written.shape
+        indices = np.flatnonzero(written)
+        colors = texture.reshape(height * width, -1)[indices]
+        return cls(width, height, indices, colors, confidence.ravel()[indices])
+
+    def apply(self, texture, confidence):
+        """
+        writes the texels into a dense texture, a texel is only overwritten if it has a lower confidence
+
+        :param texture: texture array (rows x columns x channels), changed in place
+        :param confidence: confidence map of the texture, changed in place
+        """
+        if texture.shape[:2] != (self.height, self.width) or texture.shape[2] != self.colors.shape[1]:
+            raise ValueError("partial texture doesn't match the texture")
+        better = self.confidence > confidence.ravel()[self.indices]
+        indices = self.indices[better]
+        texture.reshape(self.height * self.width, -1)[indices] = self.colors[better]
+        confidence.ravel()[indices] = self.confidence[better]
+
+    def save(self, file_path):
+        """
+        saves the partial texture as compact binary file
+
+        :param file_path: path to partial texture file
+        """
+        with open(file_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.colors.shape[1], self.width, self.height, len(self.indices)))
+            f.write(self.indices.astype('<u4').tobytes())
+            f.write(self.colors.tobytes())
+            f.write(self.confidence.astype('<f4').tobytes())
+
+
+def read_partial(file_path):
+    """
+    :param file_path: path to partial texture file
+    :return: partial texture
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("partial texture file is too short")
+    magic, version, channels, width, height, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("file is no partial texture")
+    if version != VERSION:
+        raise ValueError("unsupported version of partial texture: " + str(version))
+    if len(data) != HEADER.size + count * (4 + channels + 4):
+        raise ValueError("partial texture file is corrupted")
+
+    offset = HEADER.size
+    indices = np.frombuffer(data, dtype='<u4', count=count, offset=offset)
+    offset += 4 * count
+    colors = np.frombuffer(data, dtype=np.uint8, count=count * channels, offset=offset).reshape(count, channels)
+    offset += count * channels
+    confidence = np.frombuffer(data, dtype='<f4', count=count, offset=offset)
+    return PartialTexture(width, height, indices, colors, confidence)
+
+
+def merge_partials(*partials):
+    """
+    merges partial textures, the cost depends only on the number of texels of the partials
+    conflicts are resolved deterministically, independent of the order of the partials:
+     1. the texel with the highest confidence wins
+     2. on equal confidence the texel with the highest color (compared channel by channel) wins
+    therefore merging is associative and commutative
+
+    :param partials: partial textures of the same size
+    :return: merged partial texture
+    """
+    if len(partials) == 0:
+        raise ValueError("at least one partial texture is needed")
+    first = partials[0]
+    for p in partials[1:]:
+        if (p.width, p.height) != (first.width, first.height) or p.colors.shape[1] != first.colors.shape[1]:
+            raise ValueError("partial textures should have the same size and channels")
+
+    indices = np.concatenate([p.indices for p in partials])
+    colors = np.concatenate([p.colors for p in partials])
+    confidence = np.concatenate([p.confidence for p in partials])
+
+    # pack the channels into one sortable key
+    color_key = np.zeros(len(indices), dtype=np.uint64)
+    for channel in range(colors.shape[1]):
+        color_key = (color_key << np.uint64(8)) | colors[:, channel].astype(np.uint64)
+
+    # sort by index, then confidence, then color: the last texel of every index wins
+    order = np.lexsort((color_key, confidence, indices))
+    indices = indices[order]
+    is_last = np.append(indices[1:] != indices[:-1], True)
+    selected = order[is_last]
+    return PartialTexture(first.width, first.height, indices[is_last], colors[selected], confidence[selected])
+
+
+def reduce_partials(file_paths, processes=1):
+    """
+    reads and merges partial texture files
+    with more than one process a tree reduction is used: in each round pairs of partial textures are merged in parallel
+
+    :param file_paths: paths to partial texture files
+    :param processes: number of processes
+    :return: merged partial texture
+    """
+    if len(file_paths) == 0:
+        raise ValueError("at least one partial texture is needed")
+    if processes <= 1:
+        return merge_partials(*[read_partial(p) for p in file_paths])
+
+    with Pool(processes) as pool:
+        partials = pool.map(read_partial, file_paths)
+        while len(partials) > 1:
+            pairs = [(partials[i], partials[i + 1]) for i in range(0, len(partials) - 1, 2)]
+            merged = pool.starmap(merge_partials, pairs)
+            if len(partials) % 2 == 1:
+                # odd partial is merged in the next round
+                merged.append(partials[-1])
+            partials = merged
+    return partials[0]
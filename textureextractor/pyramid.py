@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class ImagePyramid:
+    """
+    mip pyramid of an image
+    every level halves the width and height of the previous level, a pixel is the mean of 2x2 pixels of the previous
+    level. Sampling a level therefore returns the mean of a square image region with a single lookup.
+    """
+
+    def __init__(self, image):
+        """
+        :param image: image array (rows x columns x channels)
+        """
+        level = image.astype(np.float32)
+        # levels for sampling, rounded to the image type
+        self.levels = [image]
+        while level.shape[0] > 1 or level.shape[1] > 1:
+            level = self.__downsample(level)
+            self.levels.append(np.rint(level).astype(image.dtype))
+
+    def level(self, image_area, texture_area):
+        """
+        selects the level from the footprint of a texel on the image
+        if a texel covers n x n image pixels, the level with pixels of about n x n image pixels is used
+
+        :param image_area: area of the face on the image in pixels (can be an array)
+        :param texture_area: area of the face on the texture in texels (can be an array)
+        :return: level (array of levels for arrays)
+        """
+        # pixels per texel in each direction
+        ratio = np.sqrt(np.abs(image_area) / np.abs(texture_area))
+        level = np.floor(np.log2(np.maximum(ratio, 1.0)))
+        return np.clip(level, 0, len(self.levels) - 1).astype(np.int64)
+
+    @staticmethod
+    def __downsample(image):
+        """
+        box filter of 2x2 pixels, odd sizes are padded by repeating the last row or column
+
+        :param image: float image array
+        :return: image with half the size
+        """
+        if image.shape[0] % 2 == 1:
+            image = np.concatenate([image, image[-1:]], axis=0)
+        if image.shape[1] % 2 == 1:
+            image = np.concatenate([image, image[:, -1:]], axis=1)
+        return (image[0::2, 0::2] + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2]) / 4
+
@@ -0,0 +1,222 @@
+import json
+import math
+
+from PIL import Image
+import numpy as np
+
+# maximum number of pixels which are enumerated at once by Silhouette.covers_triangles
+BATCH_PIXELS = 1 << 20
+
+
+class Silhouette:
+    """
+    binary mask of the user's silhouette in an image of the RGB stream
+    foreground pixels are True, background pixels are False
+    """
+
+    def __init__(self, mask):
+        """
+        :param mask: 2D boolean array with the same size as the image (rows x columns)
+        """
+        self.mask = np.asarray(mask, dtype=bool)
+        self.height = self.mask.shape[0]
+        self.width = self.mask.shape[1]
+        self.bounding_box = self.__calculate_bounding_box(self.mask)
+
+        # summed area table with an additional leading row and column of zeros, so the number of foreground pixels
+        # within any rectangle can be looked up in constant time
+        self.__integral = np.zeros((self.height + 1, self.width + 1), dtype=np.int64)
+        self.__integral[1:, 1:] = self.mask.cumsum(axis=0).cumsum(axis=1)
+
+    def count(self, left, top, right, bottom):
+        """
+        counts the foreground pixels within a rectangle, the rectangle is clipped to the mask
+
+        :param left: first column
+        :param top: first row
+        :param right: column after the last column
+        :param bottom: row after the last row
+        :return: number of foreground pixels
+        """
+        left = min(max(left, 0), self.width)
+        right = min(max(right, 0), self.width)
+        top = min(max(top, 0), self.height)
+        bottom = min(max(bottom, 0), self.height)
+        if left >= right or top >= bottom:
+            return 0
+        integral = self.__integral
+        return int(integral[bottom][right] - integral[top][right] - integral[bottom][left] + integral[top][left])
+
+    def covers_triangle(self, a, b, c):
+        """
+        checks whether the footprint of a triangle on the image overlaps the silhouette
+
+        :param a: first vertex as image position
+        :param b: second vertex as image position
+        :param c: third vertex as image position
+        :return: False if the triangle lies completely on the background
+        """
+        left = math.floor(min(a[0], b[0], c[0]))
+        right = math.ceil(max(a[0], b[0], c[0]))
+        top = math.floor(min(a[1], b[1], c[1]))
+        bottom = math.ceil(max(a[1], b[1], c[1]))
+
+        # cheap rejection via bounding box
+        if self.count(left, top, right + 1, bottom + 1) == 0:
+            return False
+
+        total_area = self.__triangle_area(a, b, c)
+        if total_area == 0.0:
+            # degenerated triangle, bounding box test has to be sufficient
+            return True
+        # orientation of the triangle, the edge distances are positive inside
+        orientation = 1 if total_area > 0 else -1
+
+        # a pixel overlaps the triangle if its center lies within half the pixel diagonal of the triangle
+        # test the centers of all foreground pixels within the bounding box
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right + 1, self.width), min(bottom + 1, self.height)
+        rows, columns = np.nonzero(self.mask[top:bottom, left:right])
+        p = [columns + left + 0.5, rows + top + 0.5]
+        inside = np.ones(len(rows), dtype=bool)
+        for v0, v1 in ((a, b), (b, c), (c, a)):
+            length = math.hypot(v1[0] - v0[0], v1[1] - v0[1])
+            if length == 0.0:
+                continue
+            distance = orientation * 2 * self.__triangle_area(v0, v1, p) / length
+            inside &= distance >= -math.sqrt(0.5)
+        return bool(inside.any())
+
+    def covers_triangles(self, a, b, c):
+        """
+        vectorized version of covers_triangle for many triangles
+        the bounding boxes of all triangles are tested at once with the summed area table: triangles without foreground
+        pixels in their bounding box are rejected and triangles whose bounding box lies completely on the silhouette are
+        accepted. Only the partly covered triangles are tested exactly with covers_triangle.
+
+        :param a: first vertex of every triangle as image position (triangles x 2)
+        :param b: second vertex of every triangle as image position (triangles x 2)
+        :param c: third vertex of every triangle as image position (triangles x 2)
+        :return: boolean array, False for every triangle which lies completely on the background
+        """
+        left = np.floor(np.minimum(np.minimum(a[:, 0], b[:, 0]), c[:, 0])).astype(np.int64)
+        right = np.ceil(np.maximum(np.maximum(a[:, 0], b[:, 0]), c[:, 0])).astype(np.int64) + 1
+        top = np.floor(np.minimum(np.minimum(a[:, 1], b[:, 1]), c[:, 1])).astype(np.int64)
+        bottom = np.ceil(np.maximum(np.maximum(a[:, 1], b[:, 1]), c[:, 1])).astype(np.int64) + 1
+
+        # foreground pixels within the bounding boxes clipped to the mask (see count)
+        clipped_left, clipped_right = np.clip(left, 0, self.width), np.clip(right, 0, self.width)
+        clipped_top, clipped_bottom = np.clip(top, 0, self.height), np.clip(bottom, 0, self.height)
+        integral = self.__integral
+        counts = (integral[clipped_bottom, clipped_right] - integral[clipped_top, clipped_right] -
+                  integral[clipped_bottom, clipped_left] + integral[clipped_top, clipped_left])
+
+        # every point of a triangle lies in a pixel of its bounding box, so a bounding box without background pixels
+        # (and within the mask) is covered
+        covered = counts == (right - left) * (bottom - top)
+        partial = np.flatnonzero((counts > 0) & ~covered)
+        covered[partial] = self.__covers_partial(a[partial], b[partial], c[partial], clipped_left[partial],
+                                                 clipped_top[partial], clipped_right[partial], clipped_bottom[partial])
+        return covered
+
+    def __covers_partial(self, a, b, c, left, top, right, bottom):
+        """
+        exact test of covers_triangle for many triangles, the pixels of the clipped bounding boxes of the triangles are
+        enumerated in batches
+
+        :return: boolean array, True for every triangle which overlaps the silhouette
+        """
+        total_area = self.__triangle_area(a.T, b.T, c.T)
+        # degenerated triangles, bounding box test has to be sufficient
+        covered = total_area == 0.0
+        orientation = np.where(total_area > 0, 1, -1)
+        box_width = right - left
+        pixels = np.where(covered, 0, box_width * (bottom - top))
+
+        ends = np.cumsum(pixels)
+        start = 0
+        while start < len(pixels):
+            end = int(np.searchsorted(ends, (ends[start - 1] if start > 0 else 0) + BATCH_PIXELS, side='right'))
+            end = max(end, start + 1)
+            batch = np.arange(start, end)
+            start = end
+
+            # enumerate every pixel of the bounding boxes of the batch
+            counts = pixels[batch]
+            triangles = np.repeat(batch, counts)
+            if len(triangles) == 0:
+                continue
+            offsets = np.arange(len(triangles)) - np.repeat(np.cumsum(counts) - counts, counts)
+            columns = left[triangles] + offsets % box_width[triangles]
+            rows = top[triangles] + offsets // box_width[triangles]
+            foreground = self.mask[rows, columns]
+            triangles, columns, rows = triangles[foreground], columns[foreground], rows[foreground]
+
+            # a pixel overlaps the triangle if its center lies within half the pixel diagonal of the triangle
+            p = [columns + 0.5, rows + 0.5]
+            inside = np.ones(len(triangles), dtype=bool)
+            for v0, v1 in ((a, b), (b, c), (c, a)):
+                v0, v1 = v0[triangles].T, v1[triangles].T
+                length = np.hypot(v1[0] - v0[0], v1[1] - v0[1])
+                # edges without length are ignored
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    distance = orientation[triangles] * 2 * self.__triangle_area(v0, v1, p) / length
+                inside &= (length == 0.0) | (distance >= -math.sqrt(0.5))
+            covered[np.unique(triangles[inside])] = True
+        return covered
+
+    @staticmethod
+    def __triangle_area(a, b, c):
+        return 0.5 * ((a[0] - c[0]) * (b[1] - c[1]) - (a[1] - c[1]) * (b[0] - c[0]))
+
+    @staticmethod
+    def __calculate_bounding_box(mask):
+        """
+        :param mask: boolean mask
+        :return: bounding box of all foreground pixels as (left, top, right, bottom) or None for an empty mask
+        """
+        rows = np.flatnonzero(mask.any(axis=1))
+        columns = np.flatnonzero(mask.any(axis=0))
+        if len(rows) == 0:
+            return None
+        return int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1
+
+
+def read_silhouette(mask_path):
+    """
+    reads a silhouette mask either from an image or from a run-length encoded json file
+
+    image: every pixel which is not black (or not transparent for images with alpha channel) belongs to the silhouette
+    json: uncompressed COCO run-length encoding {"size": [height, width], "counts": [...]}
+          the counts are the alternating lengths of background and foreground runs in column-major order,
+          starting with background (the first count may be 0)
+
+    :param mask_path: path to mask file
+    :return: silhouette
+    """
+    if mask_path.endswith(".json"):
+        with open(mask_path, 'r') as f:
+            rle = json.load(f)
+
+        # validate
+        if "size" not in rle:
+            raise ValueError("run-length encoded mask should have a 'size'")
+        elif "counts" not in rle:
+            raise ValueError("run-length encoded mask should have 'counts'")
+
+        elif not isinstance(rle["counts"], list):
+            raise ValueError("compressed run-length encoded masks aren't supported, counts should be a list")
+
+        height, width = rle["size"]
+        counts = np.array(rle["counts"], dtype=np.int64)
+        if counts.sum() != width * height:
+            raise ValueError("run-length encoded mask doesn't match its size")
+        # even runs are background, odd runs are foreground, the runs go down the columns like in COCO
+        mask = np.repeat(np.arange(len(counts)) % 2 == 1, counts).reshape(width, height).T
+    else:
+        img = Image.open(mask_path, mode='r')
+        if 'A' in img.getbands():
+            mask = np.array(img.getchannel('A')) > 0
+        else:
+            mask = np.array(img.convert('L')) > 0
+    return Silhouette(mask)
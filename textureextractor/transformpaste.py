@@ -0,0 +1,191 @@
+import time
+
+import numpy as np
+
+# maximum number of bounding box texels which are processed at once by paste
+BATCH_TEXELS = 1 << 20
+
+
+def calculate_affine(texture_pos, image_pos):
+    """
+    calculates the affine transformation from texture to image for every face with a single batched solve
+    an image position is calculated by [x_texture, y_texture, 1] @ affine
+
+    :param texture_pos: positions of the face vertices on the texture (faces x 3 x 2)
+    :param image_pos: positions of the face vertices on the image (faces x 3 x 2)
+    :return: affine matrices (faces x 3 x 2)
+    """
+    homogeneous = np.concatenate([texture_pos, np.ones(texture_pos.shape[:2] + (1,))], axis=2)
+    return np.linalg.solve(homogeneous, image_pos)
+
+
+def triangle_area(a, b, c):
+    """
+    vectorized version of the signed triangle area, every coordinate can be an array
+
+    :return: signed area
+    """
+    return 0.5 * ((a[0] - c[0]) * (b[1] - c[1]) - (a[1] - c[1]) * (b[0] - c[0]))
+
+
+def paste(levels, face_level, texture, texture_confidence, texture_pos, affine, face_confidence, image_box, mask=None,
+          sampling="nearest", deadline=None):
+    """
+    copies the image triangles of all faces onto the texture
+    the faces are processed in batches: the texels of the bounding boxes of all faces of a batch are enumerated in one
+    array (like fastculler.calculate_buffer), so the work grows with the covered texels and not with the number of
+    faces. The uv coverage of every texel is tested at once, the image positions are calculated with the affine matrix
+    of the face and the colors are gathered from the image in a single indexing operation.
+
+    the result matches the bounding box algorithm of the Extractor: the centers of the texels are tested with
+    barycentric coordinates, a texel is only written by faces with a higher confidence than the stored one and from
+    all of them the face with the highest confidence wins (on equal confidence the first face)
+
+    :param levels: image arrays (cropped to image_box), the first is the image, every further array halves the size of
+                   the previous one (see pyramid.ImagePyramid)
+    :param face_level: index of the image array which is sampled for every face
+    :param texture: texture array, changed in place
+    :param texture_confidence: confidence map of the texture, changed in place
+    :param texture_pos: positions of the face vertices on the texture (faces x 3 x 2)
+    :param affine: affine matrices from texture to image (faces x 3 x 2)
+    :param face_confidence: confidence of every face
+    :param image_box: box of the full image to which im is cropped (left, top, right, bottom)
+    :param mask: silhouette mask of the full image (optional)
+    :param sampling: "nearest" or "bilinear"
+    :param deadline: the copy stops when this time is reached, the first batch is always copied (optional)
+    :return: boolean array which is True for every written texel, number of texels skipped by the mask,
+             number of faces skipped because of the deadline
+    """
+    texture_height, texture_width = texture_confidence.shape
+    written = np.zeros(texture_confidence.shape, dtype=bool)
+    if len(texture_pos) == 0:
+        return written, 0, 0
+
+    flat_texture = texture.reshape(texture_height * texture_width, -1)
+    flat_confidence = texture_confidence.reshape(-1)
+    flat_written = written.reshape(-1)
+    # texels which could be improved, but whose source pixel is background
+    flat_masked = np.zeros(flat_written.shape, dtype=bool)
+
+    # bounding boxes of the faces on the texture (same as the bounding box algorithm)
+    min_x = np.floor(texture_pos[:, :, 0].min(axis=1)).astype(np.int64)
+    max_x = np.ceil(texture_pos[:, :, 0].max(axis=1)).astype(np.int64)
+    min_y = np.floor(texture_pos[:, :, 1].min(axis=1)).astype(np.int64)
+    max_y = np.ceil(texture_pos[:, :, 1].max(axis=1)).astype(np.int64)
+    box_width = max_x - min_x
+    texels = box_width * (max_y - min_y)
+    total_area = triangle_area(texture_pos[:, 0].T, texture_pos[:, 1].T, texture_pos[:, 2].T)
+
+    # split the faces into batches, so the enumerated texels fit into memory
+    ends = np.cumsum(texels)
+    start = 0
+    while start < len(texels):
+        if deadline is not None and start > 0 and time.time() > deadline:
+            break
+        end = int(np.searchsorted(ends, (ends[start - 1] if start > 0 else 0) + BATCH_TEXELS, side='right'))
+        end = max(end, start + 1)
+        batch = np.arange(start, end)
+        start = end
+
+        # enumerate every texel of the bounding boxes of the batch
+        counts = texels[batch]
+        faces = np.repeat(batch, counts)
+        if len(faces) == 0:
+            continue
+        offsets = np.arange(len(faces)) - np.repeat(np.cumsum(counts) - counts, counts)
+        x = min_x[faces] + offsets % box_width[faces]
+        y = min_y[faces] + offsets // box_width[faces]
+        # texel centers
+        p = [x + 0.5, y + 0.5]
+
+        # uv coverage of every texel
+        c1, c2, c3 = texture_pos[faces, 0].T, texture_pos[faces, 1].T, texture_pos[faces, 2].T
+        area = total_area[faces]
+        alpha = triangle_area(c2, c3, p) / area
+        beta = triangle_area(c3, c1, p) / area
+        gamma = triangle_area(c1, c2, p) / area
+        inside = (alpha >= 0) & (beta >= 0) & (gamma >= 0)
+
+        # the texture map is a torus (see Extractor.__copy_pixel)
+        texel_idx = (y % texture_height) * texture_width + (x % texture_width)
+        improvable = np.flatnonzero(inside & (face_confidence[faces] > flat_confidence[texel_idx]))
+        if len(improvable) == 0:
+            continue
+        faces, texel_idx = faces[improvable], texel_idx[improvable]
+        center_x, center_y = p[0][improvable], p[1][improvable]
+
+        # image position of every texel via the affine matrix of its face
+        a = affine[faces]
+        image_x = center_x * a[:, 0, 0] + center_y * a[:, 1, 0] + a[:, 2, 0]
+        image_y = center_x * a[:, 0, 1] + center_y * a[:, 1, 1] + a[:, 2, 1]
+
+        if mask is not None:
+            # source pixel is background
+            pixel_x = np.floor(image_x).astype(np.int64)
+            pixel_y = np.floor(image_y).astype(np.int64)
+            in_image = (pixel_x >= 0) & (pixel_x < mask.shape[1]) & (pixel_y >= 0) & (pixel_y < mask.shape[0])
+            foreground = np.zeros(len(faces), dtype=bool)
+            foreground[in_image] = mask[pixel_y[in_image], pixel_x[in_image]]
+            flat_masked[texel_idx[~foreground]] = True
+            faces, texel_idx = faces[foreground], texel_idx[foreground]
+            image_x, image_y = image_x[foreground], image_y[foreground]
+            if len(faces) == 0:
+                continue
+
+        # the face with the highest confidence wins, on equal confidence the first face
+        # (later batches only overwrite texels with a higher confidence)
+        confidence = face_confidence[faces]
+        order = np.lexsort((faces, -confidence, texel_idx))
+        _, first = np.unique(texel_idx[order], return_index=True)
+        winner = order[first]
+
+        # gather the colors of all texels of a level at once
+        x_selected = image_x[winner] - image_box[0]
+        y_selected = image_y[winner] - image_box[1]
+        level_selected = face_level[faces[winner]]
+        colors = np.empty((len(winner), flat_texture.shape[1]), dtype=flat_texture.dtype)
+        for level in np.unique(level_selected):
+            at_level = level_selected == level
+            scale = 1 << int(level)
+            colors[at_level] = __sample(levels[level], x_selected[at_level] / scale,
+                                        y_selected[at_level] / scale, sampling)
+        idx = texel_idx[winner]
+        flat_texture[idx] = colors
+        flat_confidence[idx] = confidence[winner]
+        flat_written[idx] = True
+
+    return written, int((flat_masked & ~flat_written).sum()), len(texels) - start
+
+
+def __sample(im, x, y, sampling):
+    """
+    samples the image at continuous positions
+
+    :param im: image array
+    :param x: columns on the image
+    :param y: rows on the image
+    :param sampling: "nearest" (pixel containing the position) or "bilinear"
+    :return: colors
+    """
+    if sampling == "nearest":
+        return im[np.floor(y).astype(np.int64), np.floor(x).astype(np.int64)]
+    elif sampling == "bilinear":
+        height, width = im.shape[:2]
+        # pixel centers are at .5
+        x = x - 0.5
+        y = y - 0.5
+        x0 = np.floor(x)
+        y0 = np.floor(y)
+        fx = (x - x0)[:, None]
+        fy = (y - y0)[:, None]
+        x0 = x0.astype(np.int64)
+        y0 = y0.astype(np.int64)
+        x1 = np.clip(x0 + 1, 0, width - 1)
+        y1 = np.clip(y0 + 1, 0, height - 1)
+        x0 = np.clip(x0, 0, width - 1)
+        y0 = np.clip(y0, 0, height - 1)
+        top = im[y0, x0] * (1 - fx) + im[y0, x1] * fx
+        bottom = im[y1, x0] * (1 - fx) + im[y1, x1] * fx
+        return np.rint(top * (1 - fy) + bottom * fy).astype(im.dtype)
+    raise ValueError("unknown sampling: " + str(sampling))
+
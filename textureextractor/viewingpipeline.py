@@ -89,6 +89,19 @@ class Pipeline:
         m_an rotates all vertices and normals in order to orientate the scene by the new axis
         both transformations can be combined in a single matrix view_mat
         """
+        m_rotate, view_mat = self.view_matrices()
+
+        for i, v in enumerate(self.vertices):
+            self.vertices[i] = np.matmul(view_mat, v)
+
+        # only the rotation needs to be applied to the normals
+        for i, n in enumerate(self.normals):
+            self.normals[i] = np.matmul(m_rotate, n)
+
+    def view_matrices(self):
+        """
+        :return: rotation matrix m_rotate and view matrix view_mat (see apply_view_transformation)
+        """
         m_translate = np.identity(4)
         m_translate[0][3] = -self.camera_pos[0]
         m_translate[1][3] = -self.camera_pos[1]
@@ -100,13 +113,7 @@ class Pipeline:
                              [0, 0, 0, 1]])
 
         view_mat = np.matmul(m_rotate, m_translate)
-
-        for i, v in enumerate(self.vertices):
-            self.vertices[i] = np.matmul(view_mat, v)
-
-        # only the rotation needs to be applied to the normals
-        for i, n in enumerate(self.normals):
-            self.normals[i] = np.matmul(m_rotate, n)
+        return m_rotate, view_mat
 
     def apply_perspective_transformation(self):
         """
@@ -137,12 +144,88 @@ class Pipeline:
         :param width: width of the screen/image in pixel
         :param height: height of the screen/image in pixel
         """
+        m_screen = self.screen_matrix(width, height)
+
+        for i, v in enumerate(self.vertices):
+            self.vertices[i] = np.matmul(m_screen, v)
+
+    @staticmethod
+    def screen_matrix(width, height):
+        """
+        :param width: width of the screen/image in pixel
+        :param height: height of the screen/image in pixel
+        :return: matrix of the screen transformation
+        """
         m_screen = np.zeros((4, 4))
         m_screen[0][0] = width / 2
         m_screen[1][1] = - height / 2
         m_screen[0][3] = width / 2
         m_screen[1][3] = height / 2
         m_screen[3][3] = 1
+        return m_screen
 
-        for i, v in enumerate(self.vertices):
-            self.vertices[i] = np.matmul(m_screen, v)
+
+class FastPipeline(Pipeline):
+    """
+    vectorized version of the pipeline
+    vertices and normals are stored as arrays (rows are homogeneous vectors) and transformed with a single matrix
+    multiplication
+    """
+
+    def set_vertices(self, vertices):
+        """
+        homogenize vertices and convert to numpy array
+
+        :param vertices: list of vertices
+        """
+        vertices = np.array(vertices, dtype=float).reshape(-1, 3)
+        self.vertices = np.hstack([vertices, np.ones((len(vertices), 1))])
+
+    def get_vertices(self):
+        """
+        :return: normalized vertices as list
+        """
+        # divide by w value
+        return (self.vertices[:, :3] / self.vertices[:, 3:]).tolist()
+
+    def set_normals(self, normals):
+        """
+        homogenize normals and convert to numpy array
+
+        :param normals: list of normals
+        """
+        normals = np.array(normals, dtype=float).reshape(-1, 3)
+        self.normals = np.hstack([normals, np.ones((len(normals), 1))])
+
+    def get_normals(self):
+        """
+        :return: normals as list
+        """
+        return self.normals[:, :3].tolist()
+
+    def apply_view_transformation(self):
+        """
+        see Pipeline.apply_view_transformation
+        """
+        m_rotate, view_mat = self.view_matrices()
+        self.vertices = np.matmul(self.vertices, view_mat.T)
+        self.normals = np.matmul(self.normals, m_rotate.T)
+
+    def apply_perspective_transformation(self):
+        """
+        see Pipeline.apply_perspective_transformation
+        """
+        tan_h = math.tan(math.radians(self.fov_h/2))
+        tan_v = math.tan(math.radians(self.fov_v/2))
+        z = self.vertices[:, 2]
+        at_center = z == 0
+        # values at the optical center are transformed to 0
+        abs_z = np.where(at_center, 1, np.abs(z))
+        self.vertices[:, 0] = np.where(at_center, 0, self.vertices[:, 0] / (tan_h * abs_z))
+        self.vertices[:, 1] = np.where(at_center, 0, self.vertices[:, 1] / (tan_v * abs_z))
+
+    def apply_screen_transformation(self, width, height):
+        """
+        see Pipeline.apply_screen_transformation
+        """
+        self.vertices = np.matmul(self.vertices, self.screen_matrix(width, height).T)